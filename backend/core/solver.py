@@ -0,0 +1,181 @@
+"""
+Retrograde solver for Tic-Tac-Toe.
+
+Enumerates every reachable canonical position once, then works backward
+from the terminal positions to give each one its exact minimax value and
+distance to the result. The table is indexed by canonical id, so a solved
+position is a single byte lookup.
+"""
+
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.tictactoe import BoardGeometry, STANDARD_GEOMETRY
+
+
+UNKNOWN = 0xFF
+FILE_MAGIC = b"TTTSOLV1"
+
+
+class SolvedPositionTable:
+    """
+    Exact value and distance for every reachable position, indexed by canonical id.
+
+    Values are from the perspective of the player to move: 1 win, 0 draw,
+    -1 loss. Distance is the number of plies to the end of the game under
+    optimal play (fastest win, slowest loss). Each entry is packed into one
+    byte as ``(value + 1) << 4 | distance``; unreachable ids hold UNKNOWN.
+    """
+
+    def __init__(self, entries: bytearray, geometry: BoardGeometry = STANDARD_GEOMETRY):
+        self.entries = entries
+        self.geometry = geometry
+
+    def lookup(self, state_id: int) -> Optional[Tuple[int, int]]:
+        """Return (value, distance) for a canonical id, or None if it is not reachable."""
+        entry = self.entries[state_id]
+        if entry == UNKNOWN:
+            return None
+        return (entry >> 4) - 1, entry & 0x0F
+
+    def lookup_bits(self, own_bits: int, opp_bits: int) -> Optional[Tuple[int, int]]:
+        """Lookup a position given as bitboards of the player to move and the opponent."""
+        return self.lookup(self.geometry.canonicalize(own_bits, opp_bits)[0])
+
+    def __len__(self) -> int:
+        return sum(1 for entry in self.entries if entry != UNKNOWN)
+
+    def save(self, filename: str):
+        """Write the table to disk (one byte per canonical id)."""
+        with open(filename, 'wb') as f:
+            f.write(FILE_MAGIC)
+            f.write(self.entries)
+
+    @classmethod
+    def load(cls, filename: str) -> "SolvedPositionTable":
+        """Read a table written by save."""
+        with open(filename, 'rb') as f:
+            data = f.read()
+        if not data.startswith(FILE_MAGIC):
+            raise ValueError(f"{filename} is not a solved position table")
+        entries = bytearray(data[len(FILE_MAGIC):])
+        if len(entries) != STANDARD_GEOMETRY.empty_id * 2 + 1:
+            raise ValueError(f"{filename} has the wrong size for a 3x3 table")
+        return cls(entries)
+
+
+def _children(geometry: BoardGeometry, state_id: int) -> List[Tuple[int, bool]]:
+    """(child canonical id, mover won) for every move from a non-terminal position."""
+    board = geometry.state_id_to_board(state_id)
+    own_bits = sum(geometry.cell_bits[i] for i, cell in enumerate(board) if cell == 1)
+    opp_bits = sum(geometry.cell_bits[i] for i, cell in enumerate(board) if cell == -1)
+    children = []
+    for action in geometry.actions_from_mask(~(own_bits | opp_bits) & geometry.full_mask):
+        new_own = own_bits | geometry.cell_bits[action]
+        won = any(new_own & mask == mask for mask in geometry.cell_win_masks[action])
+        # The opponent moves next, so it becomes the "own" side of the child
+        child_id, _ = geometry.canonicalize(opp_bits, new_own)
+        children.append((child_id, won))
+    return children
+
+
+def solve_positions(geometry: BoardGeometry = STANDARD_GEOMETRY) -> SolvedPositionTable:
+    """Build the solved position table by retrograde analysis."""
+    if geometry.num_cells > 9:
+        raise ValueError("Retrograde solving is only supported for the 3x3 board")
+
+    # Forward pass: canonical positions by ply, with their successors
+    successors: Dict[int, List[Tuple[int, bool]]] = {}
+    plies = [[geometry.empty_id]]
+    seen = {geometry.empty_id}
+    terminal = set()
+    for _ in range(geometry.num_cells):
+        next_ply = []
+        for state_id in plies[-1]:
+            if state_id in terminal:
+                continue
+            successors[state_id] = _children(geometry, state_id)
+            for child_id, won in successors[state_id]:
+                if won:
+                    terminal.add(child_id)
+                if child_id not in seen:
+                    seen.add(child_id)
+                    next_ply.append(child_id)
+        plies.append(next_ply)
+
+    # Backward pass: terminal positions first, then each earlier ply
+    entries = bytearray([UNKNOWN]) * (geometry.empty_id * 2 + 1)
+    for ply in reversed(plies):
+        for state_id in ply:
+            if state_id in terminal:
+                value, distance = -1, 0  # The previous move completed a line
+            elif state_id not in successors:
+                value, distance = 0, 0  # Full board
+            else:
+                best = None
+                for child_id, won in successors[state_id]:
+                    if won:
+                        child_value, child_distance = 1, 1
+                    else:
+                        entry = entries[child_id]
+                        child_value = 1 - (entry >> 4)  # Negate the child's value
+                        child_distance = (entry & 0x0F) + 1
+                    # Prefer higher values, then fast wins and slow losses
+                    key = (child_value, -child_distance * child_value)
+                    if best is None or key > best[0]:
+                        best = (key, child_value, child_distance)
+                _, value, distance = best
+            entries[state_id] = (value + 1) << 4 | distance
+
+    return SolvedPositionTable(entries, geometry)
+
+
+_solved_table = None
+
+
+def get_solved_table(filename: Optional[str] = None) -> SolvedPositionTable:
+    """
+    Return the process-wide solved table, building it on first use.
+    If filename is given, the table is loaded from it when present and
+    written to it after building otherwise.
+    """
+    global _solved_table
+    if _solved_table is None:
+        if filename and os.path.exists(filename):
+            _solved_table = SolvedPositionTable.load(filename)
+        else:
+            _solved_table = solve_positions()
+            if filename:
+                _solved_table.save(filename)
+    return _solved_table
+
+
+def test_solver():
+    """Test the retrograde solver."""
+    import time
+    from core.tictactoe import TicTacToe
+
+    print("Testing Retrograde Solver")
+    print("=" * 40)
+
+    start = time.perf_counter()
+    table = solve_positions()
+    elapsed = time.perf_counter() - start
+    print(f"Solved {len(table):,} canonical positions in {elapsed * 1000:.1f} ms")
+
+    game = TicTacToe()
+    value, distance = table.lookup(game.get_state_id())
+    print(f"Empty board: value {value}, distance {distance} (expected: draw in 9)")
+    assert (value, distance) == (0, 9)
+
+    game.board = [1, 1, 0, -1, -1, 0, 0, 0, 0]
+    game.current_player = 1
+    print(f"X to move with two threats: {table.lookup(game.get_state_id())} (expected: (1, 1))")
+    assert table.lookup(game.get_state_id()) == (1, 1)
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    test_solver()
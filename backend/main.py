@@ -11,7 +11,7 @@ import os
 # Add backend directory to path
 sys.path.append(os.path.dirname(__file__))
 
-from agents.perfect_agent import PerfectMinimaxAgent
+from agents.perfect_agent import PerfectMinimaxAgent, SearchStatsCollector, configure_shared_cache
 from core.tictactoe import TicTacToe
 
 app = Flask(__name__)
@@ -38,8 +38,12 @@ CORS(app, resources={
     }
 })
 
-# Initialize the AI agent
-ai_agent = PerfectMinimaxAgent()
+# Initialize the AI agent. Search state is per call and the shared transposition
+# table is thread-safe, so one agent serves all request threads and reuses work
+if 'SOLVER_CACHE_SIZE' in os.environ:
+    configure_shared_cache(int(os.environ['SOLVER_CACHE_SIZE']))
+search_stats = SearchStatsCollector()  # Per-move stats, including the slowest positions
+ai_agent = PerfectMinimaxAgent(stats_hook=search_stats)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -47,7 +51,16 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "message": "Tic-Tac-Toe API is running",
-        "agent": "Perfect Minimax AI"
+        "agent": "Perfect Minimax AI",
+        "cache": ai_agent.get_cache_stats()
+    })
+
+@app.route('/api/stats', methods=['GET'])
+def get_search_stats():
+    """Aggregated search stats of the AI agent and its transposition table"""
+    return jsonify({
+        "search": search_stats.get_summary(),
+        "cache": ai_agent.get_cache_stats()
     })
 
 @app.route('/api/move', methods=['POST'])
@@ -120,6 +133,68 @@ def get_ai_move():
     except Exception as e:
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
+@app.route('/api/analyze', methods=['POST'])
+def analyze_position():
+    """
+    Score every legal move for the player to move
+    
+    Expected JSON:
+    {
+        "board": [1, 0, 0, 0, 0, 0, 0, 0, 0],
+        "player": -1
+    }
+    
+    Returns:
+    {
+        "value": 0,  # 1=win, 0=draw, -1=loss for the player to move
+        "distance": 8,  # Plies to the end of the game with best play
+        "moves": {"1": {"value": -1, "distance": 6}, "4": {"value": 0, "distance": 8}, ...},
+        "principal_variation": [4, 1, 2, 6, 3, 5, 7, 8]
+    }
+    """
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+        
+        board = data.get('board')
+        player = data.get('player')
+        
+        if not board:
+            return jsonify({"error": "Board state is required"}), 400
+        
+        if not isinstance(board, list) or len(board) != 9:
+            return jsonify({"error": "Board must be a list of 9 elements"}), 400
+        
+        if player not in [1, -1]:
+            return jsonify({"error": "Player must be 1 or -1"}), 400
+        
+        # Validate board values
+        for i, cell in enumerate(board):
+            if cell not in [0, 1, -1]:
+                return jsonify({"error": f"Invalid value {cell} at position {i}"}), 400
+        
+        game = TicTacToe()
+        game.board = board.copy()
+        game.current_player = player
+        
+        if game.check_winner() or len(game.get_available_actions()) == 0:
+            return jsonify({"error": "Game is already over"}), 400
+        
+        analysis = ai_agent.analyze(game)
+        
+        return jsonify({
+            "value": analysis['value'],
+            "distance": analysis['distance'],
+            "moves": {str(action): {"value": value, "distance": distance}
+                      for action, (value, distance) in analysis['moves'].items()},
+            "principal_variation": analysis['principal_variation']
+        })
+        
+    except Exception as e:
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
 @app.route('/api/validate', methods=['POST'])
 def validate_board():
     """
@@ -185,8 +260,10 @@ if __name__ == '__main__':
     print("Available endpoints:")
     print("  GET  /api/health - Health check")
     print("  POST /api/move   - Get AI move")
+    print("  POST /api/analyze - Score every move")
+    print("  GET  /api/stats  - Search statistics")
     print("  POST /api/validate - Validate board state")
     
     port = int(os.environ.get('PORT', 5001))
     debug_mode = os.environ.get('FLASK_ENV') != 'production'
-    app.run(debug=debug_mode, host='0.0.0.0', port=port)
+    app.run(debug=debug_mode, host='0.0.0.0', port=port, threaded=True)
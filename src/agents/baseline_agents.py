@@ -11,7 +11,10 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from core.tictactoe import TicTacToe
+from core.tictactoe import TicTacToe, STANDARD_GEOMETRY
+from core.solver import get_solved_table
+from core.tactics import find_win_or_block
+from agents.perfect_agent import SearchStatsCollector
 
 
 class RandomAgent:
@@ -40,20 +43,10 @@ class HeuristicAgent:
         if not available_actions:
             raise ValueError("No available actions!")
         
-        # Check for immediate win
-        for action in available_actions:
-            test_game = game.copy()
-            test_game.make_move(action)
-            if test_game.winner == game.current_player:
-                return action
-        
-        # Check for immediate block
-        for action in available_actions:
-            test_game = game.copy()
-            test_game.current_player = -game.current_player
-            test_game.make_move(action)
-            if test_game.winner == -game.current_player:
-                return action
+        # Immediate win, then immediate block
+        tactical_action = find_win_or_block(game)
+        if tactical_action is not None:
+            return tactical_action
         
         # Prefer center
         if 4 in available_actions:
@@ -74,9 +67,10 @@ class MinimaxAgent:
     
     def __init__(self):
         self.name = "Minimax"
+        self.solved_table = get_solved_table()  # Shared, memoized 3x3 values
     
     def evaluate_position(self, game: TicTacToe) -> int:
-        """Evaluate current position using minimax."""
+        """Evaluate current position using minimax (1 X wins, -1 O wins, 0 draw)."""
         if game.game_over:
             if game.winner == 1:
                 return 1
@@ -85,23 +79,27 @@ class MinimaxAgent:
             else:
                 return 0
         
-        available_actions = game.get_available_actions()
+        # Reachable 3x3 positions are solved; table values are for the player to move
+        if game.geometry is STANDARD_GEOMETRY:
+            entry = self.solved_table.lookup(game.get_state_id())
+            if entry is not None:
+                return entry[0] * game.current_player
+        
+        available_actions = game.legal_actions()
         if not available_actions:
             return 0
         
-        # Try each possible move
-        scores = []
+        # Try each possible move, keeping the best score for the current player
+        maximizing = game.current_player == 1
+        best_score = None
         for action in available_actions:
-            test_game = game.copy()
-            test_game.make_move(action)
-            score = self.evaluate_position(test_game)
-            scores.append(score)
+            game.make_move(action)
+            score = self.evaluate_position(game)
+            game.undo_move()
+            if best_score is None or (score > best_score if maximizing else score < best_score):
+                best_score = score
         
-        # Return best score for current player
-        if game.current_player == 1:
-            return max(scores)
-        else:
-            return min(scores)
+        return best_score
     
     def choose_action(self, game: TicTacToe) -> int:
         """Choose best action using minimax."""
@@ -113,9 +111,9 @@ class MinimaxAgent:
         best_score = float('-inf') if game.current_player == 1 else float('inf')
         
         for action in available_actions:
-            test_game = game.copy()
-            test_game.make_move(action)
-            score = self.evaluate_position(test_game)
+            game.make_move(action)
+            score = self.evaluate_position(game)
+            game.undo_move()
             
             if game.current_player == 1:  # Maximizing player
                 if score > best_score:
@@ -134,6 +132,7 @@ class TournamentHarness:
     
     def __init__(self):
         self.results = {}
+        self.search_stats = {}  # Agent name -> SearchStatsCollector
     
     def play_game(self, agent1, agent2, verbose: bool = False) -> Tuple[int, int]:
         """Play a game between two agents."""
@@ -173,6 +172,10 @@ class TournamentHarness:
                 'draws': 0,
                 'total_games': 0
             }
+            # Aggregate per-move search stats of agents that report them
+            if hasattr(agent, 'stats_hook') and agent.stats_hook is None:
+                self.search_stats[agent.name] = SearchStatsCollector()
+                agent.stats_hook = self.search_stats[agent.name]
         
         # Play all pairs
         for i, agent1 in enumerate(agents):
@@ -241,6 +244,16 @@ class TournamentHarness:
             win_rate = stats['wins'] / max(1, stats['total_games']) * 100
             print(f"{agent_name:<15} {stats['wins']:<8} {stats['losses']:<8} "
                   f"{stats['draws']:<8} {win_rate:<10.1f}%")
+        
+        if self.search_stats:
+            print("\nSearch Stats:")
+            print("-" * 60)
+            for agent_name, collector in self.search_stats.items():
+                summary = collector.get_summary()
+                slowest = summary['slowest'][0]['wall_time'] if summary['slowest'] else 0.0
+                print(f"{agent_name:<15} {summary['calls']} moves, {summary['nodes']:,} nodes, "
+                      f"mean {summary['mean_time'] * 1000:.2f} ms, slowest {slowest * 1000:.2f} ms")
+                print(f"{'':<15} branches: {summary['branches']}")
 
 
 def main():
@@ -0,0 +1,309 @@
+"""
+Monte Carlo Tree Search (UCT with priors) on bitboards.
+
+Each node keeps its visit count and summed value, children are selected
+with the PUCT rule (mean value plus a prior-weighted exploration bonus),
+and leaves are scored by a tactical rollout that takes immediate wins and
+blocks. Results that are certain are proven up the tree (a node is won
+once one child is lost for the opponent, and decided once every child is),
+so proven subtrees are not searched again and a proven root ends the
+search early. The tree is kept between calls: when the next search starts
+from a position already in the tree (one or two plies on), that subtree
+and its statistics become the new root.
+
+Priors and the value of rollouts cut off at max_depth come from optional
+callbacks, so a learned Q-table can guide the search.
+"""
+
+import math
+import os
+import random
+import sys
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.tictactoe import TicTacToe, BoardGeometry, STANDARD_GEOMETRY
+from core.tactics import win_cells
+
+# prior_fn(own_bits, opp_bits, actions) -> prior per action (summing to 1)
+PriorFn = Callable[[int, int, Sequence[int]], Sequence[float]]
+# value_fn(own_bits, opp_bits) -> value in [-1, 1] for the player to move
+ValueFn = Callable[[int, int], float]
+
+
+class MCTSNode:
+    """
+    Search tree node for the position with ``own_bits`` to move.
+    
+    ``value_sum`` is from the side that moved into the node, so a parent
+    picks the child with the highest mean directly. ``terminal_value`` is
+    set for finished games and proven positions, from the side to move
+    (1 won, 0 draw, -1 lost).
+    """
+    
+    def __init__(self, own_bits: int, opp_bits: int, action: Optional[int] = None,
+                 prior: float = 1.0, terminal_value: Optional[float] = None):
+        self.own_bits = own_bits
+        self.opp_bits = opp_bits
+        self.action = action
+        self.prior = prior
+        self.terminal_value = terminal_value
+        self.children: Optional[List["MCTSNode"]] = None
+        self.visits = 0
+        self.value_sum = 0.0
+    
+    def mean_value(self) -> float:
+        """Average value for the side that moved into this node."""
+        return self.value_sum / self.visits if self.visits else 0.0
+
+
+class MCTS:
+    """UCT search over one board geometry, reusing its tree between moves."""
+    
+    def __init__(self,
+                 geometry: BoardGeometry = STANDARD_GEOMETRY,
+                 iterations: int = 100,
+                 exploration_constant: float = 1.4,
+                 max_depth: int = 10,
+                 prior_fn: Optional[PriorFn] = None,
+                 value_fn: Optional[ValueFn] = None,
+                 reuse_tree: bool = True):
+        if iterations < 1:
+            raise ValueError("MCTS needs at least one iteration!")
+        self.geometry = geometry
+        self.iterations = iterations
+        self.exploration_constant = exploration_constant
+        self.max_depth = max_depth
+        self.prior_fn = prior_fn
+        self.value_fn = value_fn
+        self.reuse_tree = reuse_tree
+        self.root: Optional[MCTSNode] = None
+        
+        # Statistics
+        self.searches = 0
+        self.reused_visits = 0
+    
+    @classmethod
+    def from_config(cls, config: Dict, **kwargs) -> "MCTS":
+        """Build from the ``mcts`` section of config.yaml (iterations, exploration_constant, max_depth)."""
+        return cls(iterations=config.get('iterations', 100),
+                   exploration_constant=config.get('exploration_constant', 1.4),
+                   max_depth=config.get('max_depth', 10),
+                   **kwargs)
+    
+    def reset(self):
+        """Drop the search tree."""
+        self.root = None
+    
+    def search(self, game: TicTacToe) -> int:
+        """
+        Run up to the configured number of iterations and return the most
+        visited move, or the best move as soon as the root is proven.
+        """
+        if game.game_over:
+            raise ValueError("Cannot search a finished game!")
+        if game.current_player == 1:
+            own_bits, opp_bits = game.x_bits, game.o_bits
+        else:
+            own_bits, opp_bits = game.o_bits, game.x_bits
+        
+        root = self._find_root(own_bits, opp_bits)
+        self.root = root
+        self.searches += 1
+        self.reused_visits += root.visits
+        
+        for _ in range(self.iterations):
+            if root.terminal_value is not None:
+                break
+            self._iterate(root)
+        
+        if root.terminal_value is not None:
+            # Proven root: take a child that keeps the proven value
+            best = max((child for child in root.children if child.terminal_value is not None),
+                       key=lambda child: (-child.terminal_value, child.visits))
+        else:
+            best = max(root.children, key=lambda child: (child.visits, child.mean_value()))
+        return best.action
+    
+    def action_stats(self) -> Dict[int, Tuple[int, float]]:
+        """Visits and mean value of each root move from the last search."""
+        if self.root is None or not self.root.children:
+            return {}
+        return {child.action: (child.visits, child.mean_value()) for child in self.root.children}
+    
+    def _find_root(self, own_bits: int, opp_bits: int) -> MCTSNode:
+        """Reuse the node for this position if it is within two plies of the old root."""
+        if self.reuse_tree and self.root is not None:
+            frontier = [self.root]
+            for _ in range(3):
+                for node in frontier:
+                    if node.own_bits == own_bits and node.opp_bits == opp_bits:
+                        return node
+                frontier = [child for node in frontier for child in (node.children or ())]
+        return MCTSNode(own_bits, opp_bits)
+    
+    def _iterate(self, root: MCTSNode):
+        """One selection, expansion, rollout and backup pass."""
+        node = root
+        path = [root]
+        while node.children and node.terminal_value is None:
+            node = self._select_child(node)
+            path.append(node)
+        
+        # Value from the side to move at the leaf
+        if node.terminal_value is not None:
+            value = node.terminal_value
+        else:
+            self._expand(node)
+            value = self._rollout(node.own_bits, node.opp_bits, len(path) - 1)
+        
+        for node in reversed(path):
+            node.visits += 1
+            node.value_sum -= value  # Stored for the side that moved into the node
+            value = -value
+        
+        # Prove ancestors whose result is now certain
+        for node in reversed(path[:-1]):
+            if node.terminal_value is not None or not self._prove(node):
+                break
+    
+    @staticmethod
+    def _prove(node: MCTSNode) -> bool:
+        """Set terminal_value if the children decide the node; returns whether they did."""
+        best = -1.0
+        for child in node.children:
+            if child.terminal_value is None:
+                best = None
+            elif child.terminal_value == -1.0:
+                node.terminal_value = 1.0  # A move that leaves the opponent lost
+                return True
+            elif best is not None:
+                best = max(best, -child.terminal_value)
+        if best is None:
+            return False
+        node.terminal_value = best
+        return True
+    
+    def _select_child(self, node: MCTSNode) -> MCTSNode:
+        """PUCT: mean value plus c * prior * sqrt(N) / (1 + n)."""
+        scale = self.exploration_constant * math.sqrt(node.visits)
+        best, best_score = None, -math.inf
+        for child in node.children:
+            score = child.mean_value() + scale * child.prior / (1 + child.visits)
+            if score > best_score:
+                best, best_score = child, score
+        return best
+    
+    def _expand(self, node: MCTSNode):
+        """Create a child for every legal move, scoring wins and draws immediately."""
+        geometry = self.geometry
+        own_bits, opp_bits = node.own_bits, node.opp_bits
+        empty = ~(own_bits | opp_bits) & geometry.full_mask
+        actions = geometry.actions_from_mask(empty)
+        if self.prior_fn is not None:
+            priors = self.prior_fn(own_bits, opp_bits, actions)
+        else:
+            priors = [1.0 / len(actions)] * len(actions)
+        
+        winning = win_cells(own_bits, opp_bits, geometry)
+        node.children = []
+        for action, prior in zip(actions, priors):
+            cell_bit = geometry.cell_bits[action]
+            if winning & cell_bit:
+                terminal_value = -1.0  # The opponent (to move in the child) has lost
+            elif empty == cell_bit:
+                terminal_value = 0.0
+            else:
+                terminal_value = None
+            node.children.append(MCTSNode(opp_bits, own_bits | cell_bit, action, float(prior), terminal_value))
+    
+    def _rollout(self, own_bits: int, opp_bits: int, depth: int) -> float:
+        """
+        Play on with wins first, then blocks, then random moves.
+        Returns the result for the side to move at the start.
+        """
+        geometry = self.geometry
+        sign = 1.0
+        while True:
+            empty = ~(own_bits | opp_bits) & geometry.full_mask
+            if not empty:
+                return 0.0
+            if win_cells(own_bits, opp_bits, geometry):
+                return sign
+            if depth >= self.max_depth:
+                return sign * self.value_fn(own_bits, opp_bits) if self.value_fn is not None else 0.0
+            
+            # A move that is not a win cannot complete a line, so only blocks matter here
+            cells = win_cells(opp_bits, own_bits, geometry) or empty
+            cell_bit = geometry.cell_bits[random.choice(geometry.actions_from_mask(cells))]
+            own_bits, opp_bits = opp_bits, own_bits | cell_bit
+            sign = -sign
+            depth += 1
+
+
+def test_mcts():
+    """Test the MCTS engine."""
+    import time
+    from core.solver import get_solved_table
+    
+    print("Testing MCTS")
+    print("=" * 40)
+    random.seed(0)
+    
+    # X must block the diagonal; only one move avoids losing
+    game = TicTacToe()
+    game.board = [1, 0, 0, 0, -1, 0, 0, 0, 0]
+    game.current_player = 1
+    game.make_move(8)
+    game.make_move(2)
+    game.display_board()
+    mcts = MCTS(iterations=400)
+    action = mcts.search(game)
+    print(f"MCTS move: {action} (expected: 6)")
+    assert action == 6
+    print(f"Root statistics: {mcts.action_stats()}")
+    
+    # A late position is solved before the iteration budget runs out
+    late = TicTacToe()
+    for move in (4, 0, 8, 2, 1, 7):
+        late.make_move(move)
+    mcts_late = MCTS(iterations=1000)
+    action = mcts_late.search(late)
+    print(f"Late position: {mcts_late.root.visits} visits, root value {mcts_late.root.terminal_value}")
+    assert mcts_late.root.terminal_value is not None and mcts_late.root.visits < 1000
+    
+    # The next search reuses the subtree two plies on
+    game.make_move(6)
+    game.make_move(3)
+    visits = mcts.root.visits
+    mcts.search(game)
+    print(f"Reused {mcts.reused_visits} visits (tree had {visits})")
+    assert mcts.reused_visits > 0
+    print("✓ Move choice and tree reuse passed!")
+    
+    # Every choice from random mid-game positions should keep the solved value
+    table = get_solved_table()
+    mcts = MCTS(iterations=200, reuse_tree=False)
+    mistakes = 0
+    start = time.perf_counter()
+    for _ in range(100):
+        game = TicTacToe()
+        for _ in range(random.randint(2, 5)):
+            game.make_move(random.choice(game.get_available_actions()))
+            if game.game_over:
+                break
+        if game.game_over:
+            continue
+        best = table.lookup(game.get_state_id())[0]
+        action = mcts.search(game)
+        game.make_move(action)
+        value = -table.lookup(game.get_state_id())[0] if not game.game_over else abs(game.winner)
+        mistakes += value < best
+    elapsed = time.perf_counter() - start
+    print(f"Value-losing moves: {mistakes}/100 ({elapsed * 10:.1f} ms per search)")
+    assert mistakes <= 5
+    print("✓ Search quality passed!")
+
+
+if __name__ == "__main__":
+    test_mcts()
@@ -12,10 +12,358 @@ To view a copy of this license, visit http://creativecommons.org/licenses/by-nc/
 import sys
 import os
 import random
+import time
+import threading
+import multiprocessing as mp
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from core.tictactoe import TicTacToe
-from typing import Tuple, Optional
+from core.tictactoe import TicTacToe, BoardGeometry, STANDARD_GEOMETRY
+from core.solver import get_solved_table
+from core.tactics import find_win_or_block, win_cells
+from typing import Tuple, Optional, Hashable, Callable
+
+
+# Transposition table bound flags
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+DEFAULT_CACHE_SIZE = 1_000_000
+DEFAULT_CACHE_SHARDS = 16
+
+
+class SearchTimeout(Exception):
+    """Raised inside a search when its time or node budget is used up."""
+
+
+class _CacheShard:
+    """One lock-protected LRU segment of a PositionCache."""
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def evict(self):
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+
+class PositionCache:
+    """
+    Bounded position-evaluation cache with least-recently-used eviction.
+    
+    Maps canonical state ids to search entries and keeps hit, miss and
+    eviction counts for monitoring. Keys are spread over independently
+    locked shards (each with its own LRU order), so concurrent searches
+    rarely wait on each other.
+    """
+    
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE, num_shards: int = DEFAULT_CACHE_SHARDS):
+        if max_size < 1:
+            raise ValueError("Cache size must be at least 1!")
+        self.num_shards = max(1, min(num_shards, max_size))
+        self.shards = [_CacheShard(0) for _ in range(self.num_shards)]
+        self.resize(max_size)
+    
+    def _shard(self, key: Hashable) -> _CacheShard:
+        return self.shards[hash(key) % self.num_shards]
+    
+    def get(self, key: Hashable):
+        """Return the entry for key (marking it recently used), or None."""
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is None:
+                shard.misses += 1
+                return None
+            shard.hits += 1
+            shard.entries.move_to_end(key)
+            return entry
+    
+    def put(self, key: Hashable, entry):
+        """Store an entry, evicting the least recently used ones over max_size."""
+        shard = self._shard(key)
+        with shard.lock:
+            shard.entries[key] = entry
+            shard.entries.move_to_end(key)
+            shard.evict()
+    
+    def resize(self, max_size: int):
+        """Change the maximum size, evicting entries if it shrinks."""
+        if max_size < 1:
+            raise ValueError("Cache size must be at least 1!")
+        self.max_size = max_size
+        # Split the capacity over the shards; the first ones take the remainder
+        base, extra = divmod(max_size, self.num_shards)
+        for index, shard in enumerate(self.shards):
+            with shard.lock:
+                shard.max_size = max(1, base + (1 if index < extra else 0))
+                shard.evict()
+    
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        for shard in self.shards:
+            with shard.lock:
+                shard.entries.clear()
+                shard.hits = 0
+                shard.misses = 0
+                shard.evictions = 0
+    
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self.shards)
+    
+    def get_stats(self) -> dict:
+        """Get cache statistics (summed over the shards)."""
+        size = hits = misses = evictions = 0
+        for shard in self.shards:
+            with shard.lock:
+                size += len(shard.entries)
+                hits += shard.hits
+                misses += shard.misses
+                evictions += shard.evictions
+        lookups = hits + misses
+        return {
+            'size': size,
+            'max_size': self.max_size,
+            'hits': hits,
+            'misses': misses,
+            'evictions': evictions,
+            'hit_rate': hits / lookups if lookups > 0 else 0.0
+        }
+
+
+# One cache per board geometry, shared by every agent in the process
+_shared_caches = {}
+_shared_cache_size = DEFAULT_CACHE_SIZE
+_shared_caches_lock = threading.Lock()
+
+
+def get_shared_cache(geometry: BoardGeometry = STANDARD_GEOMETRY) -> PositionCache:
+    """Return the process-wide cache for a geometry, creating it on first use."""
+    cache = _shared_caches.get(geometry.key)
+    if cache is None:
+        with _shared_caches_lock:
+            cache = _shared_caches.get(geometry.key)
+            if cache is None:
+                cache = PositionCache(_shared_cache_size)
+                _shared_caches[geometry.key] = cache
+    return cache
+
+
+def configure_shared_cache(max_size: int):
+    """Set the maximum size of the shared caches, including existing ones."""
+    global _shared_cache_size
+    if max_size < 1:
+        raise ValueError("Cache size must be at least 1!")
+    with _shared_caches_lock:
+        _shared_cache_size = max_size
+        for cache in _shared_caches.values():
+            cache.resize(max_size)
+
+
+_move_ranks = {}
+
+
+def get_move_ranks(geometry: BoardGeometry) -> Tuple[int, ...]:
+    """
+    Static move-ordering rank of every cell: cells on more winning lines
+    first (center, then corners, then edges on 3x3), ties by index.
+    """
+    ranks = _move_ranks.get(geometry.key)
+    if ranks is None:
+        order = sorted(range(geometry.num_cells),
+                       key=lambda cell: (-len(geometry.cell_win_masks[cell]), cell))
+        ranks = [0] * geometry.num_cells
+        for rank, cell in enumerate(order):
+            ranks[cell] = rank
+        ranks = tuple(ranks)
+        _move_ranks[geometry.key] = ranks
+    return ranks
+
+
+_rng_local = threading.local()
+
+
+def get_thread_rng() -> random.Random:
+    """
+    Random generator of the calling thread, seeded from the global random
+    module on first use (so random.seed still makes single-threaded runs
+    repeatable).
+    """
+    rng = getattr(_rng_local, 'rng', None)
+    if rng is None:
+        rng = random.Random(random.getrandbits(64))
+        _rng_local.rng = rng
+    return rng
+
+
+class SearchContext:
+    """
+    State of one search call: the shared cache it uses, move-ordering
+    tables, budget and counters. Agents create one per call, so a single
+    agent can serve several threads at once.
+    """
+    
+    def __init__(self, geometry: BoardGeometry, deadline: Optional[float] = None,
+                 node_limit: Optional[int] = None):
+        self.geometry = geometry
+        self.cache = get_shared_cache(geometry)
+        self.win_score = geometry.num_cells + 1
+        self.move_ranks = get_move_ranks(geometry)
+        self.killer_moves = [[] for _ in range(geometry.num_cells + 1)]
+        self.history = [0] * geometry.num_cells
+        self.deadline = deadline  # time.perf_counter() value
+        self.node_limit = node_limit
+        self.nodes = 0
+        self.cutoffs = 0
+        self.tt_hits = 0
+        self.max_ply = 0
+        self.completed_depth = 0
+        # Root-parallel workers: the shared best root score and the last value read
+        self.shared_alpha = None
+        self.root_alpha = float('-inf')
+
+
+class SearchStats:
+    """
+    Record of one choose_action call.
+    
+    branch tells how the move was found: 'forced' (only one legal move),
+    'table' (solved-position lookup), 'win' or 'block' (immediate tactic)
+    or 'search'. max_depth is the deepest ply reached below the root.
+    """
+    
+    def __init__(self, board: list, current_player: int):
+        self.board = board
+        self.current_player = current_player
+        self.branch = 'search'
+        self.action = None
+        self.nodes = 0
+        self.cutoffs = 0
+        self.tt_hits = 0
+        self.max_depth = 0
+        self.completed_depth = 0
+        self.wall_time = 0.0
+    
+    def to_dict(self) -> dict:
+        """Get the record as a dictionary."""
+        return {
+            'board': self.board,
+            'current_player': self.current_player,
+            'branch': self.branch,
+            'action': self.action,
+            'nodes': self.nodes,
+            'cutoffs': self.cutoffs,
+            'tt_hits': self.tt_hits,
+            'max_depth': self.max_depth,
+            'completed_depth': self.completed_depth,
+            'wall_time': self.wall_time
+        }
+
+
+class SearchStatsCollector:
+    """
+    Stats hook that aggregates SearchStats records: calls and time per
+    branch, total nodes, and the slowest positions seen.
+    """
+    
+    def __init__(self, keep_slowest: int = 10):
+        self.keep_slowest = keep_slowest
+        self.lock = threading.Lock()
+        self.reset()
+    
+    def __call__(self, stats: SearchStats):
+        with self.lock:
+            self.calls += 1
+            self.nodes += stats.nodes
+            self.total_time += stats.wall_time
+            self.branches[stats.branch] = self.branches.get(stats.branch, 0) + 1
+            self.slowest.append(stats)
+            self.slowest.sort(key=lambda record: record.wall_time, reverse=True)
+            del self.slowest[self.keep_slowest:]
+    
+    def reset(self):
+        """Forget all records."""
+        self.calls = 0
+        self.nodes = 0
+        self.total_time = 0.0
+        self.branches = {}
+        self.slowest = []
+    
+    def get_summary(self) -> dict:
+        """Get aggregated statistics."""
+        with self.lock:
+            return {
+                'calls': self.calls,
+                'nodes': self.nodes,
+                'total_time': self.total_time,
+                'mean_time': self.total_time / self.calls if self.calls > 0 else 0.0,
+                'branches': dict(self.branches),
+                'slowest': [record.to_dict() for record in self.slowest]
+            }
+
+
+# Workers never fork from a (possibly multi-threaded) server process: a fork
+# taken while another thread holds a cache shard lock would copy it locked
+_WORKER_START_METHOD = 'forkserver' if 'forkserver' in mp.get_all_start_methods() else 'spawn'
+
+# Per-process state of root-parallel search workers
+_worker_alpha = None
+_worker_agent = None
+
+
+def _init_search_worker(shared_alpha):
+    """Pool initializer: keep the shared root alpha and a search agent per worker."""
+    global _worker_alpha, _worker_agent
+    _worker_alpha = shared_alpha
+    _worker_agent = PerfectMinimaxAgent(name="Search worker")
+
+
+def _search_root_move(rows: int, cols: int, k: int, x_bits: int, o_bits: int,
+                      current_player: int, action: int, depth: int,
+                      deadline: Optional[float]):
+    """
+    Search one root move in a worker process.
+    
+    The window starts at the best root score any worker has proven so far
+    and narrows whenever the search re-reads it (see _negamax); an exact
+    score that beats it is published back to the other workers.
+    Returns (action, score, exact, (nodes, cutoffs, tt hits, max ply), CPU
+    seconds), or None if the deadline
+    (a time.time() value) passed first.
+    """
+    game = TicTacToe(rows, cols, k)
+    game.x_bits, game.o_bits = x_bits, o_bits
+    game.current_player = current_player
+    game.make_move(action)
+    
+    if deadline is not None:
+        deadline = time.perf_counter() + (deadline - time.time())
+    context = SearchContext(game.geometry, deadline=deadline)
+    context.shared_alpha = _worker_alpha
+    context.root_alpha = _worker_alpha.value
+    
+    start = time.process_time()
+    try:
+        score = -_worker_agent._negamax(context, game, 0, float('-inf'), -context.root_alpha, depth - 1)
+    except SearchTimeout:
+        return None
+    cpu_time = time.process_time() - start
+    
+    exact = score > context.root_alpha  # Otherwise only an upper bound
+    if exact:
+        with _worker_alpha.get_lock():
+            if score > _worker_alpha.value:
+                _worker_alpha.value = score
+    counters = (context.nodes, context.cutoffs, context.tt_hits, context.max_ply)
+    return action, score, exact, counters, cpu_time
 
 
 class PerfectMinimaxAgent:
@@ -24,17 +372,55 @@ class PerfectMinimaxAgent:
     This agent plays optimally and cannot be beaten.
     """
     
-    def __init__(self, name: str = "Perfect Minimax"):
+    def __init__(self, name: str = "Perfect Minimax", use_solved_table: bool = False,
+                 solved_table_file: Optional[str] = None, move_ordering: bool = True,
+                 parallel_workers: int = 0,
+                 stats_hook: Optional[Callable[[SearchStats], None]] = None):
+        """
+        Args:
+            name: Display name
+            use_solved_table: Answer 3x3 positions from the retrograde solver
+                table instead of searching
+            solved_table_file: Optional on-disk copy of the solved table
+            move_ordering: Search tactical, killer and high-history moves
+                first (disable only for comparison)
+            parallel_workers: Split root moves across this many worker
+                processes on boards larger than 3x3 (0 searches sequentially)
+            stats_hook: Optional callable given the SearchStats of every
+                choose_action call (e.g. a SearchStatsCollector)
+        """
         self.name = name
+        self.move_ordering = move_ordering
+        self.parallel_workers = parallel_workers
+        self.pool = None
+        self.shared_alpha = None
+        self.pool_lock = threading.Lock()  # One parallel search at a time
+        self.parallel_stats = {}
+        # Totals over all calls, updated under stats_lock; search state lives
+        # in a SearchContext per call
+        self.stats_lock = threading.Lock()
         self.nodes_evaluated = 0
-        self.cache = {}  # Memoization for faster evaluation
+        self.completed_depth = 0
+        self.last_stats = None
+        self.stats_hook = stats_hook
+        # Shared transposition table of the last geometry searched:
+        # canonical id -> (value, bound flag, depth, canonical best move)
+        self.cache = get_shared_cache()
+        self.solved_table = get_solved_table(solved_table_file) if use_solved_table else None
         
-    def choose_action(self, game: TicTacToe) -> int:
+    def choose_action(self, game: TicTacToe, time_budget: Optional[float] = None,
+                      node_budget: Optional[int] = None) -> int:
         """
         Choose the best action using Minimax with alpha-beta pruning.
         
+        Without a budget the search runs to the end of the game and the move
+        is optimal. With a budget it deepens iteratively and returns the best
+        move of the deepest iteration that finished in time.
+        
         Args:
             game: Current game state
+            time_budget: Optional search time limit in seconds
+            node_budget: Optional limit on nodes searched for this move
             
         Returns:
             Best action to take
@@ -43,39 +429,169 @@ class PerfectMinimaxAgent:
         if not available_actions:
             raise ValueError("No available actions!")
         
+        stats = SearchStats(game.board, game.current_player)
+        start = time.perf_counter()
+        stats.action = self._choose_action(game, available_actions, time_budget, node_budget, stats)
+        stats.wall_time = time.perf_counter() - start
+        
+        with self.stats_lock:
+            self.last_stats = stats
+        if self.stats_hook is not None:
+            self.stats_hook(stats)
+        return stats.action
+    
+    def _choose_action(self, game: TicTacToe, available_actions: list, time_budget: Optional[float],
+                       node_budget: Optional[int], stats: SearchStats) -> int:
+        """Pick the move for choose_action, recording how it was found in stats."""
         # If only one move, take it immediately
         if len(available_actions) == 1:
+            stats.branch = 'forced'
             return available_actions[0]
         
-        # Check for immediate win
-        for action in available_actions:
-            test_game = game.copy()
-            test_game.make_move(action)
-            if test_game.winner == game.current_player:
+        if self.solved_table is not None and game.geometry is STANDARD_GEOMETRY:
+            action = self._choose_from_table(game, available_actions)
+            if action is not None:
+                stats.branch = 'table'
                 return action
         
-        # Check for immediate block
-        for action in available_actions:
-            test_game = game.copy()
-            test_game.current_player = -game.current_player
-            test_game.make_move(action)
-            if test_game.winner == -game.current_player:
+        # Immediate win, then immediate block
+        tactical_action = find_win_or_block(game)
+        if tactical_action is not None:
+            own_bits = game.x_bits if game.current_player == 1 else game.o_bits
+            opp_bits = game.o_bits if game.current_player == 1 else game.x_bits
+            winning = win_cells(own_bits, opp_bits, game.geometry) >> tactical_action & 1
+            stats.branch = 'win' if winning else 'block'
+            return tactical_action
+        
+        # Shuffle to add variety when multiple moves are equally good
+        get_thread_rng().shuffle(available_actions)
+        
+        if time_budget is None and node_budget is None:
+            context = SearchContext(game.geometry)
+            try:
+                action = self._search_root(context, game, available_actions, len(available_actions))[0]
+                context.completed_depth = len(available_actions)
                 return action
+            finally:
+                self._finish_search(context, stats)
+        
+        # Iterative deepening until the budget runs out or the game tree is exhausted
+        context = SearchContext(
+            game.geometry,
+            deadline=time.perf_counter() + time_budget if time_budget is not None else None,
+            node_limit=node_budget
+        )
+        best_action = available_actions[0]
+        try:
+            for depth in range(1, len(available_actions) + 1):
+                best_action, _ = self._search_root(context, game, available_actions, depth)
+                context.completed_depth = depth
+                # Search the previous best move first in the next iteration
+                available_actions.remove(best_action)
+                available_actions.insert(0, best_action)
+        except SearchTimeout:
+            pass
+        finally:
+            self._finish_search(context, stats)
+        
+        return best_action
+    
+    def _finish_search(self, context: SearchContext, stats: Optional[SearchStats] = None):
+        """Fold a finished search into the agent's totals and the call's stats."""
+        if stats is not None:
+            stats.nodes = context.nodes
+            stats.cutoffs = context.cutoffs
+            stats.tt_hits = context.tt_hits
+            stats.max_depth = context.max_ply
+            stats.completed_depth = context.completed_depth
+        with self.stats_lock:
+            self.nodes_evaluated += context.nodes
+            self.completed_depth = context.completed_depth
+            self.cache = context.cache
+    
+    def analyze(self, game: TicTacToe) -> dict:
+        """
+        Score every legal move exactly and find the principal variation.
+        
+        All moves share the transposition table, so analysing a position the
+        agent has already searched (or the moves along the PV) is cheap.
+        
+        Args:
+            game: Current game state
+            
+        Returns:
+            Dictionary with the position's value and distance for the player
+            to move (1 win, 0 draw, -1 loss; plies to the end of the game),
+            'moves' mapping every legal action to its (value, distance), and
+            'principal_variation', the list of optimal moves to the end
+        """
+        if game.game_over or not game.legal_actions():
+            raise ValueError("No available actions!")
+        
+        context = SearchContext(game.geometry)
+        scores = self._score_moves(context, game)
+        moves = {action: self._score_to_result(context, score, game) for action, score in scores}
+        
+        # Follow the best move (first in board order among ties) to the end of the game
+        principal_variation = []
+        pv_scores = scores
+        while True:
+            best_action = max(pv_scores, key=lambda item: item[1])[0]
+            principal_variation.append(best_action)
+            game.make_move(best_action)
+            if game.game_over:
+                break
+            pv_scores = self._score_moves(context, game)
+        for _ in principal_variation:
+            game.undo_move()
+        self._finish_search(context)
+        
+        value, distance = max(moves.values(), key=lambda result: (result[0], -result[1] * result[0]))
+        return {
+            'value': value,
+            'distance': distance,
+            'moves': moves,
+            'principal_variation': principal_variation
+        }
+    
+    def _score_moves(self, context: SearchContext, game: TicTacToe) -> list:
+        """Exact (action, score) for every legal move, searched with a full window."""
+        scores = []
+        for action in game.get_available_actions():
+            game.make_move(action)
+            try:
+                scores.append((action, -self._negamax(context, game, 0, float('-inf'), float('inf'))))
+            finally:
+                game.undo_move()
+        return scores
+    
+    @staticmethod
+    def _score_to_result(context: SearchContext, score: float, game: TicTacToe) -> Tuple[int, int]:
+        """Convert a root-move score to (value, distance in plies) for the player to move."""
+        if score >= 1:
+            return 1, context.win_score - score + 1
+        if score <= -1:
+            return -1, context.win_score + score + 1
+        return 0, len(game.legal_actions())  # A draw fills the board
+    
+    def _search_root(self, context: SearchContext, game: TicTacToe, actions: list,
+                     depth: int) -> Tuple[int, float]:
+        """Search every root move to the given depth and return (best action, score)."""
+        if (self.parallel_workers > 0 and context.node_limit is None
+                and game.geometry.num_cells > STANDARD_GEOMETRY.num_cells):
+            return self._search_root_parallel(context, game, actions, depth)
         
-        # Use Minimax with alpha-beta pruning
         best_action = None
         best_score = float('-inf')
         alpha = float('-inf')
         beta = float('inf')
         
-        # Shuffle to add variety when multiple moves are equally good
-        random.shuffle(available_actions)
-        
-        for action in available_actions:
-            test_game = game.copy()
-            test_game.make_move(action)
-            
-            score = self._minimax(test_game, 0, alpha, beta, False, game.current_player)
+        for action in actions:
+            game.make_move(action)
+            try:
+                score = -self._negamax(context, game, 0, -beta, -alpha, depth - 1)
+            finally:
+                game.undo_move()
             
             if score > best_score:
                 best_score = score
@@ -85,72 +601,301 @@ class PerfectMinimaxAgent:
             if beta <= alpha:
                 break  # Alpha-beta pruning
         
-        return best_action
+        return best_action, best_score
+    
+    def _choose_from_table(self, game: TicTacToe, available_actions: list) -> Optional[int]:
+        """
+        Pick an optimal move by looking up every child in the solved table.
+        Prefers wins, then draws; fastest wins and slowest losses; random among ties.
+        Returns None if a child is not in the table (a board that cannot arise
+        in play, e.g. one set up directly), so the caller searches instead.
+        """
+        best_key = None
+        best_actions = []
+        
+        for action in available_actions:
+            game.make_move(action)
+            if game.game_over:
+                value, distance = (1 if game.winner != 0 else 0), 1
+            else:
+                entry = self.solved_table.lookup(game.get_state_id())
+                if entry is None:
+                    game.undo_move()
+                    return None
+                child_value, child_distance = entry
+                value, distance = -child_value, child_distance + 1
+            game.undo_move()
+            
+            key = (value, -distance * value)
+            if best_key is None or key > best_key:
+                best_key = key
+                best_actions = [action]
+            elif key == best_key:
+                best_actions.append(action)
+        
+        return get_thread_rng().choice(best_actions)
+    
+    def _search_root_parallel(self, context: SearchContext, game: TicTacToe, actions: list,
+                              depth: int) -> Tuple[int, float]:
+        """
+        Search root moves concurrently in the worker pool.
+        Records wall time, summed worker CPU time and their ratio (how busy
+        the workers were, not a speedup over sequential search) in parallel_stats.
+        Parallel searches by one agent run one at a time, as they share the
+        pool's root alpha.
+        """
+        deadline = None
+        if context.deadline is not None:
+            deadline = time.time() + (context.deadline - time.perf_counter())
+        
+        geometry = game.geometry
+        with self.pool_lock:
+            if self.pool is None:
+                mp_context = mp.get_context(_WORKER_START_METHOD)
+                self.shared_alpha = mp_context.Value('d', float('-inf'))
+                self.pool = ProcessPoolExecutor(max_workers=self.parallel_workers,
+                                                mp_context=mp_context,
+                                                initializer=_init_search_worker,
+                                                initargs=(self.shared_alpha,))
+            self.shared_alpha.value = float('-inf')
+            start = time.perf_counter()
+            futures = [
+                self.pool.submit(_search_root_move, geometry.rows, geometry.cols, geometry.k,
+                                 game.x_bits, game.o_bits, game.current_player, action, depth, deadline)
+                for action in actions
+            ]
+            results = [future.result() for future in futures]
+            wall_time = time.perf_counter() - start
+        if any(result is None for result in results):
+            raise SearchTimeout()
+        
+        # Highest score wins; an exact score beats an equal upper bound
+        best_action, best_score, _, _, _ = max(results, key=lambda result: (result[1], result[2]))
+        worker_cpu_time = sum(result[4] for result in results)
+        nodes = sum(result[3][0] for result in results)
+        context.nodes += nodes
+        context.cutoffs += sum(result[3][1] for result in results)
+        context.tt_hits += sum(result[3][2] for result in results)
+        context.max_ply = max(context.max_ply, max(result[3][3] for result in results))
+        self.parallel_stats = {
+            'workers': self.parallel_workers,
+            'nodes': nodes,
+            'wall_time': wall_time,
+            'worker_cpu_time': worker_cpu_time,
+            'worker_utilization': worker_cpu_time / wall_time if wall_time > 0 else 0.0
+        }
+        return best_action, best_score
     
-    def _minimax(self, game: TicTacToe, depth: int, alpha: float, beta: float, 
-                 is_maximizing: bool, original_player: int) -> float:
+    def close(self):
+        """Shut down the worker pool of the parallel mode, if any."""
+        with self.pool_lock:
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
+                self.shared_alpha = None
+    
+    def _negamax(self, context: SearchContext, game: TicTacToe, ply: int, alpha: float,
+                 beta: float, depth: Optional[int] = None) -> float:
         """
-        Minimax algorithm with alpha-beta pruning.
+        Negamax with alpha-beta pruning, a transposition table and move ordering.
         
         Args:
+            context: State of the current search call
             game: Current game state
-            depth: Current depth in the game tree
-            alpha: Alpha value for pruning
-            beta: Beta value for pruning
-            is_maximizing: Whether this is a maximizing node
-            original_player: The player making the original move
+            ply: Moves made since the root move
+            alpha: Lower bound of the search window (player to move)
+            beta: Upper bound of the search window (player to move)
+            depth: Plies left to search (None searches to the end of the game)
             
         Returns:
-            Best score for this position
+            Score for the player to move: win_score - ply for a win at ply
+            (prefer faster wins), negated for a loss, 0 for a draw, and a
+            heuristic strictly between -1 and 1 where the depth runs out
         """
-        self.nodes_evaluated += 1
+        context.nodes += 1
+        if ply > context.max_ply:
+            context.max_ply = ply
+        if context.node_limit is not None and context.nodes > context.node_limit:
+            raise SearchTimeout()
+        if not context.nodes & 0xFF:
+            if context.deadline is not None and time.perf_counter() > context.deadline:
+                raise SearchTimeout()
+            if context.shared_alpha is not None:
+                context.root_alpha = max(context.root_alpha, context.shared_alpha.value)
         
-        # Terminal state evaluation
+        # Terminal state evaluation: the previous move decided the game
         if game.game_over:
-            if game.winner == original_player:
-                score = 10 - depth  # Prefer faster wins
-            elif game.winner == -original_player:
-                score = depth - 10  # Prefer slower losses
-            else:
-                score = 0  # Draw
-            return score
+            return 0 if game.winner == 0 else ply - context.win_score
         
-        available_actions = game.get_available_actions()
-        if not available_actions:
-            return 0
-        
-        # Check if it's the original player's turn
-        is_original_player_turn = (game.current_player == original_player)
-        
-        if is_original_player_turn:
-            # Maximizing for original player
-            max_eval = float('-inf')
-            for action in available_actions:
-                test_game = game.copy()
-                test_game.make_move(action)
-                eval_score = self._minimax(test_game, depth + 1, alpha, beta, False, original_player)
-                max_eval = max(max_eval, eval_score)
-                alpha = max(alpha, eval_score)
+        if game.current_player == 1:
+            own_bits, opp_bits = game.x_bits, game.o_bits
+        else:
+            own_bits, opp_bits = game.o_bits, game.x_bits
+        geometry = game.geometry
+        empty = ~(own_bits | opp_bits) & geometry.full_mask
+        
+        forced = 0
+        if self.move_ordering:
+            # An immediate win is the best possible result
+            if win_cells(own_bits, opp_bits, geometry):
+                return context.win_score - (ply + 1)
+            # Two opponent threats lose; one must be blocked
+            forced = win_cells(opp_bits, own_bits, geometry)
+            if forced & (forced - 1):
+                return (ply + 2) - context.win_score
+        
+        remaining = bin(empty).count("1")
+        if depth is None or depth > remaining:
+            depth = remaining
+        if depth <= 0:
+            return self._evaluate_lines(own_bits, opp_bits, geometry)
+        
+        state_id, symmetry = geometry.canonicalize(own_bits, opp_bits)
+        entry = context.cache.get(state_id)
+        tt_move = None
+        if entry is not None:
+            value, flag, entry_depth, canonical_move = entry
+            if canonical_move is not None:
+                tt_move = geometry.from_canonical_action(symmetry, canonical_move)
+            if entry_depth >= depth:
+                context.tt_hits += 1
+                score = self._score_from_cache(value, ply)
+                if flag == EXACT:
+                    return score
+                if flag == LOWER_BOUND:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
                 if beta <= alpha:
+                    return score
+        alpha_start, beta_start = alpha, beta
+        
+        if forced:
+            moves = [forced.bit_length() - 1]
+        elif self.move_ordering:
+            moves = self._order_moves(context, game.legal_actions(), ply, tt_move)
+        else:
+            moves = game.legal_actions()
+        
+        best_score = float('-inf')
+        best_move = None
+        bounded = context.shared_alpha is not None
+        root_cutoff = False
+        for action in moves:
+            if bounded:
+                # Narrow to the best root score found by other workers. Plies are
+                # counted from the root move, so even plies are the root opponent's.
+                bound = context.root_alpha if ply & 1 else -context.root_alpha
+                if ply & 1:
+                    if alpha < bound < beta:
+                        alpha = bound
+                        alpha_start = max(alpha_start, bound)
+                elif best_score > alpha_start and best_score >= bound:
+                    # This root move can no longer beat the shared root score
+                    context.cutoffs += 1
+                    root_cutoff = True
+                    break
+                elif alpha < bound < beta:
+                    beta = bound
+                    beta_start = min(beta_start, bound)
+            game.make_move(action)
+            try:
+                score = -self._negamax(context, game, ply + 1, -beta, -alpha, depth - 1)
+            finally:
+                game.undo_move()
+            if score > best_score:
+                best_score = score
+                best_move = action
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    context.cutoffs += 1
+                    self._record_cutoff(context, action, ply, remaining)
                     break  # Beta cutoff
-            return max_eval
+        
+        # Outside the search window the result is only a bound on the true value
+        if root_cutoff:
+            flag = LOWER_BOUND
+        elif best_score <= alpha_start:
+            flag = UPPER_BOUND
+        elif best_score >= beta_start:
+            flag = LOWER_BOUND
         else:
-            # Minimizing for opponent
-            min_eval = float('inf')
-            for action in available_actions:
-                test_game = game.copy()
-                test_game.make_move(action)
-                eval_score = self._minimax(test_game, depth + 1, alpha, beta, True, original_player)
-                min_eval = min(min_eval, eval_score)
-                beta = min(beta, eval_score)
-                if beta <= alpha:
-                    break  # Alpha cutoff
-            return min_eval
+            flag = EXACT
+        context.cache.put(state_id, (self._score_to_cache(best_score, ply), flag, depth,
+                                     geometry.to_canonical_action(symmetry, best_move)))
+        return best_score
+    
+    @staticmethod
+    def _evaluate_lines(own_bits: int, opp_bits: int, geometry: BoardGeometry) -> float:
+        """
+        Heuristic score for the player to move, strictly between -0.5 and 0.5.
+        Lines still open to one player count by the square of their stones.
+        """
+        own_score = 0
+        opp_score = 0
+        for mask in geometry.win_masks:
+            own_count = bin(own_bits & mask).count("1")
+            opp_count = bin(opp_bits & mask).count("1")
+            if opp_count == 0:
+                own_score += own_count * own_count
+            elif own_count == 0:
+                opp_score += opp_count * opp_count
+        return 0.5 * (own_score - opp_score) / (own_score + opp_score + 1)
+    
+    @staticmethod
+    def _order_moves(context: SearchContext, actions, ply: int, tt_move: Optional[int] = None) -> list:
+        """
+        The transposition table's best move first, then killer moves for this
+        ply, then the rest by history score and static rank.
+        """
+        history = context.history
+        ranks = context.move_ranks
+        ordered = sorted(actions, key=lambda action: (-history[action], ranks[action]))
+        first = [action for action in context.killer_moves[ply] if action in actions]
+        if tt_move is not None and tt_move in actions:
+            first = [tt_move] + [action for action in first if action != tt_move]
+        if first:
+            ordered = first + [action for action in ordered if action not in first]
+        return ordered
+    
+    def _record_cutoff(self, context: SearchContext, action: int, ply: int, remaining: int):
+        """Update killer and history tables after a beta cutoff."""
+        if not self.move_ordering:
+            return
+        context.history[action] += remaining * remaining
+        killers = context.killer_moves[ply]
+        if action not in killers:
+            killers.insert(0, action)
+            del killers[2:]
+    
+    @staticmethod
+    def _score_to_cache(score: float, ply: int) -> float:
+        """Make a win/loss score relative to the stored node instead of the root."""
+        if score >= 1:
+            return score + ply
+        if score <= -1:
+            return score - ply
+        return score  # Draw or heuristic
+    
+    @staticmethod
+    def _score_from_cache(value: float, ply: int) -> float:
+        """Inverse of _score_to_cache for a node found at the given ply."""
+        if value >= 1:
+            return value - ply
+        if value <= -1:
+            return value + ply
+        return value
+    
+    def get_cache_stats(self) -> dict:
+        """Get statistics of the shared transposition table."""
+        return self.cache.get_stats()
     
     def reset_cache(self):
-        """Reset the evaluation cache."""
+        """Reset the shared transposition table (for every agent) and the node count."""
         self.cache.clear()
-        self.nodes_evaluated = 0
+        with self.stats_lock:
+            self.nodes_evaluated = 0
 
 
 class HybridQLearningMinimaxAgent:
@@ -226,12 +971,13 @@ class UnbeatableAgent:
         move_count = sum(1 for cell in game.board if cell != 0)
         
         # Opening book for variety (all optimal moves)
+        rng = get_thread_rng()
         if move_count == 0:
             # First move: prefer center, corners are also optimal
-            if random.random() < 0.7:
+            if rng.random() < 0.7:
                 return 4  # Center
             else:
-                return random.choice([0, 2, 6, 8])  # Corners
+                return rng.choice([0, 2, 6, 8])  # Corners
         
         if move_count == 1 and game.current_player == -1:
             # Response to first move
@@ -241,7 +987,7 @@ class UnbeatableAgent:
             corners = [0, 2, 6, 8]
             available_corners = [c for c in corners if c in available_actions]
             if available_corners:
-                return random.choice(available_corners)
+                return rng.choice(available_corners)
         
         # For all other positions, use perfect minimax
         return self.minimax_agent.choose_action(game)
@@ -308,9 +1054,161 @@ def test_perfect_agent():
         print("Draw!")
     
     print(f"\nNodes evaluated: {agent.nodes_evaluated:,}")
+    
+    # Test 4: Table-backed mode agrees with search on move values
+    print("\nTest 4: Solved-table mode")
+    table_agent = PerfectMinimaxAgent(use_solved_table=True)
+    game.reset()
+    game.board = [1, 0, 0, 0, -1, 0, 0, 0, 1]  # O must take an edge, not a corner
+    game.current_player = -1
+    game.display_board()
+    action = table_agent.choose_action(game)
+    print(f"Agent chooses: {action} (expected: one of [1, 3, 5, 7])")
+    assert action in [1, 3, 5, 7], f"Expected an edge, got {action}"
+    
+    # Boards set up directly may not be in the table; fall back to tactics and search
+    game.board = [-1, -1, 0, 0, 0, 0, 0, 0, 0]
+    game.current_player = 1
+    action = table_agent.choose_action(game)
+    print(f"Unreachable board: agent chooses {action} (expected: 2)")
+    assert action == 2, f"Expected 2, got {action}"
+    print("✓ Test passed!")
+    
+    # Test 5: The transposition table carries work over between calls
+    print("\nTest 5: Transposition table reuse")
+    agent.reset_cache()
+    game.reset()
+    agent.choose_action(game)
+    first_nodes = agent.nodes_evaluated
+    agent.choose_action(game)
+    second_nodes = agent.nodes_evaluated - first_nodes
+    print(f"Nodes: {first_nodes} on the first call, {second_nodes} on the second")
+    print(f"Cache stats: {agent.get_cache_stats()}")
+    assert second_nodes < first_nodes
+    print("✓ Test passed!")
+    
+    # Test 6: Anytime search on a board too large to solve per move
+    print("\nTest 6: Time-budgeted search on 5x5 (4 in a row)")
+    game = TicTacToe(5, 5, 4)
+    game.make_move(12)
+    start = time.perf_counter()
+    action = agent.choose_action(game, time_budget=0.2)
+    elapsed = time.perf_counter() - start
+    print(f"Agent chooses: {action} after {elapsed:.3f}s (deepest completed iteration: {agent.completed_depth})")
+    assert action in game.get_available_actions()
+    assert elapsed < 0.5, f"Search overran its budget: {elapsed:.3f}s"
+    print("✓ Test passed!")
+    
+    # Test 7: Every move scored in one analysis
+    print("\nTest 7: Multi-move analysis")
+    game = TicTacToe()
+    game.make_move(0)
+    analysis = agent.analyze(game)
+    print(f"Move values: {analysis['moves']}")
+    print(f"Principal variation: {analysis['principal_variation']}")
+    assert analysis['moves'][4] == (0, 8), "Only the center holds the draw"
+    assert all(value == -1 for action, (value, _) in analysis['moves'].items() if action != 4)
+    assert len(analysis['principal_variation']) == analysis['distance']
+    print("✓ Test passed!")
+    
+    # Test 8: Per-call search stats reach the hook
+    print("\nTest 8: Search stats hook")
+    collector = SearchStatsCollector()
+    agent = PerfectMinimaxAgent(stats_hook=collector)
+    game = TicTacToe()
+    while not game.game_over:
+        game.make_move(agent.choose_action(game))
+    print(f"Last call: {agent.last_stats.to_dict()}")
+    summary = collector.get_summary()
+    print(f"Calls: {summary['calls']}, nodes: {summary['nodes']}, branches: {summary['branches']}")
+    assert summary['calls'] == len(game.actions)
+    assert agent.last_stats.branch == 'forced'
+    print("✓ Test passed!")
     print("All tests completed!")
 
 
+# Fixed positions for search benchmarks: (rows, cols, k, moves played)
+BENCHMARK_POSITIONS = [
+    (3, 3, 3, []),
+    (3, 3, 3, [0]),
+    (3, 3, 3, [4]),
+    (3, 3, 3, [1]),
+    (3, 3, 3, [0, 4]),
+    (3, 3, 3, [4, 0, 8]),
+    (3, 3, 3, [1, 4, 3]),
+    (4, 4, 3, [5]),
+    (4, 4, 3, [5, 6, 9]),
+    (4, 4, 4, [0, 5, 10, 15, 3, 12]),
+]
+
+
+def benchmark_search():
+    """
+    Node counts and times of a full-window search over BENCHMARK_POSITIONS,
+    with and without move ordering (cache cleared before every position).
+    """
+    print("Benchmarking negamax search")
+    print("=" * 40)
+    totals = {}
+    values = {}
+    for label, move_ordering in (("unordered", False), ("ordered", True)):
+        agent = PerfectMinimaxAgent(move_ordering=move_ordering)
+        nodes = 0
+        values[label] = []
+        start = time.perf_counter()
+        for rows, cols, k, moves in BENCHMARK_POSITIONS:
+            game = TicTacToe(rows, cols, k)
+            for action in moves:
+                game.make_move(action)
+            context = SearchContext(game.geometry)
+            context.cache.clear()
+            values[label].append(agent._negamax(context, game, 0, float('-inf'), float('inf')))
+            nodes += context.nodes
+        elapsed = time.perf_counter() - start
+        totals[label] = nodes
+        print(f"{label:<10} {nodes:>10,} nodes {elapsed:>8.3f} s")
+    assert values["ordered"] == values["unordered"], "Move ordering changed a search value!"
+    print(f"Node reduction: {totals['unordered'] / totals['ordered']:.1f}x")
+
+
+def benchmark_parallel(workers: int = None, moves=(5, 10)):
+    """
+    Time one full 4x4 (4 in a row) search sequentially and root-parallel,
+    starting both from an empty cache.
+    """
+    workers = workers or os.cpu_count() or 1
+    game = TicTacToe(4, 4, 4)
+    for action in moves:
+        game.make_move(action)
+    
+    print(f"Benchmarking root-parallel search ({workers} workers, {os.cpu_count()} CPUs)")
+    print("=" * 40)
+    # Workers start in fresh processes with their own empty caches; clear
+    # this process's cache so the sequential run starts cold as well
+    get_shared_cache(game.geometry).clear()
+    parallel_agent = PerfectMinimaxAgent(parallel_workers=workers)
+    start = time.perf_counter()
+    parallel_action = parallel_agent.choose_action(game)
+    parallel_time = time.perf_counter() - start
+    parallel_agent.close()
+    
+    get_shared_cache(game.geometry).clear()
+    sequential_agent = PerfectMinimaxAgent()
+    start = time.perf_counter()
+    sequential_action = sequential_agent.choose_action(game)
+    sequential_time = time.perf_counter() - start
+    
+    stats = parallel_agent.parallel_stats
+    print(f"sequential {sequential_time:>8.3f} s  move {sequential_action}")
+    print(f"parallel   {parallel_time:>8.3f} s  move {parallel_action}")
+    print(f"Speedup over sequential: {sequential_time / parallel_time:.2f}x, "
+          f"worker utilization {stats['worker_utilization']:.2f} (worker CPU time / wall time)")
+
+
 if __name__ == "__main__":
     test_perfect_agent()
+    print()
+    benchmark_search()
+    print()
+    benchmark_parallel()
 
@@ -4,7 +4,7 @@ import random
 import math
 import multiprocessing as mp
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
-from typing import Dict, List, Tuple, Optional, Set
+from typing import Dict, List, Tuple, Optional, Set, Union
 from collections import defaultdict, deque
 import time
 import gzip
@@ -13,7 +13,151 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from core.tictactoe import TicTacToe
+from core.tictactoe import (TicTacToe, BoardGeometry, STANDARD_GEOMETRY,
+                            state_key_to_id, state_id_to_string)
+from core.tactics import find_win_or_block
+from agents.replay import PrioritizedReplayBuffer
+from agents.mcts import MCTS
+
+# Q-table keys: integer canonical ids, or legacy "[0, 1, -1, ...]" strings
+StateKey = Union[int, str]
+
+
+class DenseQTable:
+    """
+    Double Q-table in one contiguous (n_states, 2, 9) float32 array.
+    
+    Row r holds table A at [r, 0] and table B at [r, 1] for the canonical
+    state ``state_ids[r]``; ``index`` maps every possible canonical id
+    (3^9 of them) to its row, or -1 if the state has not been learned yet.
+    Rows are only added by updates, so reading never grows the table.
+    """
+    
+    def __init__(self, geometry: BoardGeometry = STANDARD_GEOMETRY, initial_capacity: int = 256):
+        self.geometry = geometry
+        self.num_actions = geometry.num_cells
+        num_ids = 3 ** geometry.num_cells
+        # There can never be more rows than ids, so 3x3 rows fit in int16
+        self.index = np.full(num_ids, -1, dtype=np.int16 if num_ids < 2 ** 15 else np.int32)
+        self.values = np.zeros((initial_capacity, 2, self.num_actions), dtype=np.float32)
+        self.state_ids = np.zeros(initial_capacity, dtype=np.int32)
+        self.num_states = 0
+        self.zero_row = np.zeros((2, self.num_actions), dtype=np.float32)
+        self.zero_row.flags.writeable = False
+    
+    def __len__(self) -> int:
+        return self.num_states
+    
+    def __contains__(self, state_id: int) -> bool:
+        return self.index[state_id] >= 0
+    
+    def get(self, state_id: int) -> np.ndarray:
+        """(2, 9) view of both tables for a state; read-only zeros if unseen."""
+        row = self.index[state_id]
+        return self.values[row] if row >= 0 else self.zero_row
+    
+    def ensure_row(self, state_id: int) -> int:
+        """Row of a state, adding a zero row if it is new."""
+        row = int(self.index[state_id])
+        if row < 0:
+            row = int(self._add_rows(1)[0])
+            self.index[state_id] = row
+            self.state_ids[row] = state_id
+        return row
+    
+    def ensure_rows(self, state_ids: np.ndarray) -> np.ndarray:
+        """Rows of many states at once, adding zero rows for new ones."""
+        state_ids = np.asarray(state_ids, dtype=np.int64)
+        rows = self.index[state_ids]
+        missing = np.unique(state_ids[rows < 0])
+        if len(missing):
+            new_rows = self._add_rows(len(missing))
+            self.index[missing] = new_rows
+            self.state_ids[new_rows] = missing
+            rows = self.index[state_ids]
+        return rows
+    
+    def _add_rows(self, count: int) -> np.ndarray:
+        needed = self.num_states + count
+        if needed > len(self.values):
+            capacity = max(needed, 2 * len(self.values))
+            values = np.zeros((capacity, 2, self.num_actions), dtype=np.float32)
+            values[:self.num_states] = self.values[:self.num_states]
+            state_ids = np.zeros(capacity, dtype=np.int32)
+            state_ids[:self.num_states] = self.state_ids[:self.num_states]
+            self.values, self.state_ids = values, state_ids
+        rows = np.arange(self.num_states, needed)
+        self.num_states = needed
+        return rows
+    
+    @property
+    def active_values(self) -> np.ndarray:
+        """(n_states, 2, 9) view of the learned rows."""
+        return self.values[:self.num_states]
+    
+    @property
+    def active_state_ids(self) -> np.ndarray:
+        """Canonical ids of the learned rows, in row order."""
+        return self.state_ids[:self.num_states]
+    
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the table arrays."""
+        return self.index.nbytes + self.values.nbytes + self.state_ids.nbytes
+
+
+def build_shaping_table(geometry: BoardGeometry = STANDARD_GEOMETRY) -> np.ndarray:
+    """
+    Board part of the reward shaping for every state id, from the side
+    coded as "own" in the id (see BoardGeometry.id_weights).
+    
+    The shaping only looks at lines, the center, corners, edges and forks,
+    which are all unchanged by the board symmetries, so canonical and
+    non-canonical ids of the same position hold the same value.
+    """
+    num_ids = 3 ** geometry.num_cells
+    digits = np.arange(num_ids)[:, None] // np.array(geometry.id_weights) % 3
+    own = digits == 2
+    empty = digits == 1
+    opp = digits == 0
+    
+    table = np.zeros(num_ids, dtype=np.float64)
+    threats = np.zeros(num_ids, dtype=np.int64)
+    for line in geometry.win_lines:
+        line = list(line)
+        own_count = own[:, line].sum(axis=1)
+        opp_count = opp[:, line].sum(axis=1)
+        empty_count = empty[:, line].sum(axis=1)
+        # Tactical pattern rewards (first matching pattern per line)
+        table += np.select(
+            [own_count == 3,
+             (own_count == 2) & (empty_count == 1),
+             (opp_count == 2) & (empty_count == 1),
+             (own_count == 1) & (empty_count == 2)],
+            [10.0, 2.0, 1.5, 0.3], 0.0)
+        threats += (own_count == 2) & (empty_count == 1)
+    
+    # Center, corner and edge preferences
+    table += 0.8 * own[:, 4]
+    table += 0.4 * own[:, [0, 2, 6, 8]].sum(axis=1)
+    table += 0.2 * own[:, [1, 3, 5, 7]].sum(axis=1)
+    
+    # Fork creation bonus (multiple threats)
+    table += np.maximum(threats - 1, 0)
+    return table
+
+
+_shaping_tables = {}
+
+
+def get_shaping_table(geometry: BoardGeometry = STANDARD_GEOMETRY) -> np.ndarray:
+    """Return the shared shaping table for a geometry, building it on first use."""
+    table = _shaping_tables.get(geometry.key)
+    if table is None:
+        table = build_shaping_table(geometry)
+        table.flags.writeable = False
+        _shaping_tables[geometry.key] = table
+    return table
 
 
 class UltraAdvancedQLearningAgent:
@@ -29,9 +173,14 @@ class UltraAdvancedQLearningAgent:
                  use_double_q: bool = True,
                  use_dyna_q: bool = True,
                  experience_replay_size: int = 10000,
-                 prioritized_replay: bool = True):
+                 prioritized_replay: bool = True,
+                 compact_state_keys: bool = True,
+                 replay_alpha: float = 0.6,
+                 replay_beta_start: float = 0.4,
+                 mcts_config: Optional[Dict] = None):
         """
         Initialize ultra-advanced Q-learning agent.
+        mcts_config is the ``mcts`` section of config.yaml.
         """
         self.alpha_start = alpha_start
         self.alpha_end = alpha_end
@@ -43,14 +192,28 @@ class UltraAdvancedQLearningAgent:
         self.use_dyna_q = use_dyna_q
         self.experience_replay_size = experience_replay_size
         self.prioritized_replay = prioritized_replay
+        self.replay_beta_start = replay_beta_start
+        self.compact_state_keys = compact_state_keys
+        self.geometry = STANDARD_GEOMETRY  # Tabular Q-learning is 3x3 only
+        
+        # Double Q-tables for stability, stored densely by canonical state id
+        self.q_table = DenseQTable(self.geometry)
         
-        # Double Q-tables for stability
-        self.q_table_a: Dict[str, np.ndarray] = {}
-        self.q_table_b: Dict[str, np.ndarray] = {}
+        # Reward shaping by state id (board part) for the player being rewarded
+        self.shaping_table = get_shaping_table(self.geometry)
         
-        # Experience replay buffer
-        self.experience_buffer = deque(maxlen=experience_replay_size)
-        self.experience_priorities = deque(maxlen=experience_replay_size)
+        # Late-game tree search; the Q-table only supplies its move priors, since
+        # rollouts on a 3x3 board finish before any useful max_depth cut-off
+        mcts_config = mcts_config or {}
+        self.use_mcts = mcts_config.get('enabled', True)
+        self.mcts_max_legal_moves = mcts_config.get('max_legal_moves', 3)
+        self.mcts = MCTS.from_config(mcts_config,
+                                     geometry=self.geometry,
+                                     prior_fn=self._mcts_priors)
+        
+        # Experience replay buffer (sum tree over TD-error priorities)
+        self.experience_buffer = PrioritizedReplayBuffer(experience_replay_size, alpha=replay_alpha,
+                                                         prioritized=prioritized_replay)
         
         # Training statistics
         self.total_steps = 0
@@ -78,105 +241,48 @@ class UltraAdvancedQLearningAgent:
         decay_factor = self.total_steps / self.epsilon_decay_steps
         return self.epsilon_start * (self.epsilon_end / self.epsilon_start) ** decay_factor
     
-    def get_q_values(self, state_key: str) -> Tuple[np.ndarray, np.ndarray]:
-        """Get Q-values for a state from both tables."""
-        if state_key not in self.q_table_a:
-            self.q_table_a[state_key] = np.zeros(9, dtype=np.float32)
-        if state_key not in self.q_table_b:
-            self.q_table_b[state_key] = np.zeros(9, dtype=np.float32)
-        return self.q_table_a[state_key], self.q_table_b[state_key]
+    def get_replay_beta(self) -> float:
+        """Importance-sampling exponent, annealed linearly to 1 over the decay steps."""
+        if self.total_steps >= self.epsilon_decay_steps:
+            return 1.0
+        
+        decay_factor = self.total_steps / self.epsilon_decay_steps
+        return self.replay_beta_start + (1.0 - self.replay_beta_start) * decay_factor
+    
+    @staticmethod
+    def _state_id(state_key: StateKey) -> int:
+        """Canonical id of a state key (legacy string keys are converted)."""
+        return state_key if isinstance(state_key, int) else state_key_to_id(state_key)
     
-    def get_combined_q_values(self, state_key: str) -> np.ndarray:
+    def _output_key(self, state_id: int) -> StateKey:
+        """State key in the agent's configured format."""
+        return state_id if self.compact_state_keys else state_id_to_string(state_id)
+    
+    def get_q_values(self, state_key: StateKey) -> Tuple[np.ndarray, np.ndarray]:
+        """Get Q-values for a state from both tables (zeros if unseen; never grows the table)."""
+        q_values = self.q_table.get(self._state_id(state_key))
+        return q_values[0], q_values[1]
+    
+    def get_combined_q_values(self, state_key: StateKey) -> np.ndarray:
         """Get combined Q-values from both tables."""
-        q_a, q_b = self.get_q_values(state_key)
-        return (q_a + q_b) / 2
+        return self.q_table.get(self._state_id(state_key)).mean(axis=0)
     
     def check_immediate_win_or_block(self, game: TicTacToe) -> Optional[int]:
         """Check for immediate win or block opportunities."""
-        available_actions = game.get_available_actions()
-        
-        # Check for immediate win
-        for action in available_actions:
-            test_game = game.copy()
-            test_game.make_move(action)
-            if test_game.winner == game.current_player:
-                return action
-        
-        # Check for immediate block
-        for action in available_actions:
-            test_game = game.copy()
-            test_game.current_player = -game.current_player
-            test_game.make_move(action)
-            if test_game.winner == -game.current_player:
-                return action
-        
-        return None
+        return find_win_or_block(game)
     
     def evaluate_ultra_advanced_patterns(self, board: List[int], player: int, move_count: int) -> float:
         """
         Ultra-advanced reward shaping with efficiency penalties and stylistic preferences.
+        The board part is read from the precomputed shaping table.
         """
-        shaping_reward = 0.0
-        
-        # Define all possible lines
-        lines = [
-            [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
-            [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
-            [0, 4, 8], [2, 4, 6]              # diagonals
-        ]
-        
-        # Tactical pattern rewards (enhanced)
-        for line in lines:
-            values = [board[i] for i in line]
-            
-            if values.count(player) == 3:
-                shaping_reward += 10.0
-            elif values.count(player) == 2 and values.count(0) == 1:
-                shaping_reward += 2.0
-            elif values.count(-player) == 2 and values.count(0) == 1:
-                shaping_reward += 1.5
-            elif values.count(player) == 1 and values.count(0) == 2:
-                shaping_reward += 0.3
-        
-        # Enhanced position bonuses with stylistic preferences
-        if board[4] == player:  # Center control (highest priority)
-            shaping_reward += 0.8
-        
-        # Corner preference (strategic)
-        corners = [0, 2, 6, 8]
-        corner_count = sum(1 for i in corners if board[i] == player)
-        shaping_reward += corner_count * 0.4
-        
-        # Edge preference (defensive)
-        edges = [1, 3, 5, 7]
-        edge_count = sum(1 for i in edges if board[i] == player)
-        shaping_reward += edge_count * 0.2
-        
-        # Efficiency penalty (encourage shorter winning sequences)
-        if move_count > 5:
-            shaping_reward -= 0.1 * (move_count - 5)
-        
-        # Fork creation bonus (multiple threats)
-        fork_count = self._count_forks(board, player)
-        shaping_reward += fork_count * 1.0
-        
-        return shaping_reward
-    
-    def _count_forks(self, board: List[int], player: int) -> int:
-        """Count fork opportunities (multiple winning threats)."""
-        lines = [
-            [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
-            [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
-            [0, 4, 8], [2, 4, 6]              # diagonals
-        ]
-        
-        threats = 0
-        for line in lines:
-            values = [board[i] for i in line]
-            if values.count(player) == 2 and values.count(0) == 1:
-                threats += 1
-        
-        return max(0, threats - 1)  # Fork = 2+ threats
+        state_id = sum(weight * (cell * player + 1) for weight, cell in zip(self.geometry.id_weights, board))
+        return float(self.shaping_table[state_id]) + self.move_count_penalty(move_count)
+    
+    @staticmethod
+    def move_count_penalty(move_count: int) -> float:
+        """Efficiency penalty (encourage shorter winning sequences)."""
+        return -0.1 * (move_count - 5) if move_count > 5 else 0.0
     
     def choose_action_with_mcts_evaluation(self, game: TicTacToe) -> int:
         """
@@ -192,122 +298,128 @@ class UltraAdvancedQLearningAgent:
         if tactical_action is not None:
             return tactical_action
         
-        # MCTS-style evaluation for complex positions
-        if len(available_actions) <= 3:  # Late game positions
+        # MCTS evaluation for complex positions
+        if self.use_mcts and len(available_actions) <= self.mcts_max_legal_moves:
             return self._mcts_evaluate_action(game, available_actions)
         
         # Standard ε-greedy for early/mid game
-        state_key = game.get_state_key()
+        state_key, symmetry = game.get_state_key_and_symmetry(compact=self.compact_state_keys)
         epsilon = self.get_epsilon()
         
         if random.random() < epsilon:
             return random.choice(available_actions)
         else:
+            # Q-values are stored in canonical board coordinates; argmax over legal moves only
             q_values = self.get_combined_q_values(state_key)
-            available_q_values = {action: q_values[action] for action in available_actions}
-            best_action = max(available_q_values, key=available_q_values.get)
-            return best_action
+            to_canonical = np.asarray(self.geometry.inverse_symmetries[symmetry])
+            legal_q_values = q_values[to_canonical[available_actions]]
+            return available_actions[int(np.argmax(legal_q_values))]
     
     def _mcts_evaluate_action(self, game: TicTacToe, available_actions: List[int]) -> int:
-        """MCTS-style evaluation for late game positions."""
-        action_scores = {}
-        
-        for action in available_actions:
-            score = 0
-            # Simulate multiple random games from this position
-            for _ in range(10):
-                test_game = game.copy()
-                test_game.make_move(action)
-                
-                # Play random game to completion
-                while not test_game.game_over and test_game.get_available_actions():
-                    random_action = random.choice(test_game.get_available_actions())
-                    test_game.make_move(random_action)
-                
-                # Score based on outcome
-                if test_game.winner == game.current_player:
-                    score += 1
-                elif test_game.winner == 0:
-                    score += 0.5
-                # Loss gets 0 points
-            
-            action_scores[action] = score
-        
-        return max(action_scores, key=action_scores.get)
+        """MCTS evaluation for late game positions (the tree carries over between moves)."""
+        return self.mcts.search(game)
+    
+    def _mcts_priors(self, own_bits: int, opp_bits: int, actions: Tuple[int, ...]) -> np.ndarray:
+        """
+        MCTS move priors: softmax of the combined Q-values over the legal
+        moves, mixed half and half with uniform so unlearned moves are tried.
+        """
+        state_id, symmetry = self.geometry.canonicalize(own_bits, opp_bits)
+        to_canonical = np.asarray(self.geometry.inverse_symmetries[symmetry])
+        q_values = self.q_table.get(state_id).mean(axis=0)[to_canonical[list(actions)]]
+        weights = np.exp(q_values - q_values.max())
+        return 0.5 * weights / weights.sum() + 0.5 / len(actions)
     
     def choose_action(self, game: TicTacToe) -> int:
         """Main action selection method."""
         return self.choose_action_with_mcts_evaluation(game)
     
-    def add_experience(self, state: str, action: int, reward: float, next_state: str, done: bool):
-        """Add experience to replay buffer."""
-        experience = (state, action, reward, next_state, done)
-        self.experience_buffer.append(experience)
+    def add_experience(self, state: StateKey, action: int, reward: float, next_state: StateKey, done: bool):
+        """Add experience to replay buffer (states are stored as canonical ids)."""
+        state_id = self._state_id(state)
+        next_id = self._state_id(next_state)
         
         # Calculate priority based on TD error
+        priority = 1.0
         if self.prioritized_replay:
-            q_a, q_b = self.get_q_values(state)
-            current_q = (q_a[action] + q_b[action]) / 2
-            
-            if next_state in self.q_table_a:
-                next_q_a = self.q_table_a[next_state]
-                next_q_b = self.q_table_b[next_state]
-                max_next_q = max(np.max(next_q_a), np.max(next_q_b))
-            else:
-                max_next_q = 0
+            current_q = self.q_table.get(state_id)[:, action].mean()
+            max_next_q = self.q_table.get(next_id).max() if next_id in self.q_table else 0
             
-            td_error = abs(reward + self.gamma * max_next_q - current_q)
-            priority = td_error + 1e-6  # Small epsilon to avoid zero priority
-            self.experience_priorities.append(priority)
-    
-    def sample_experience(self, batch_size: int = 32) -> List[Tuple]:
-        """Sample experiences from replay buffer."""
-        if len(self.experience_buffer) < batch_size:
-            return list(self.experience_buffer)
-        
-        if self.prioritized_replay and len(self.experience_priorities) > 0:
-            # Prioritized sampling
-            priorities = np.array(self.experience_priorities)
-            probabilities = priorities / np.sum(priorities)
-            indices = np.random.choice(len(self.experience_buffer), batch_size, p=probabilities)
-            return [self.experience_buffer[i] for i in indices]
-        else:
-            # Random sampling
-            return random.sample(list(self.experience_buffer), batch_size)
+            priority = abs(reward + self.gamma * max_next_q - current_q)
+        
+        self.experience_buffer.add(state_id, action, reward, next_id, done, priority)
     
-    def update_q_value_with_replay(self, state_key: str, action: int, reward: float, next_state_key: str):
-        """Update Q-value using experience replay."""
+    def sample_experience(self, batch_size: int = 32) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Sample experiences from replay buffer.
+        Returns (buffer slots, transition records, importance-sampling weights).
+        """
+        return self.experience_buffer.sample(batch_size, self.get_replay_beta())
+    
+    def update_q_value_with_replay(self, state_key: StateKey, action: int, reward: float, 
+                                   next_state_key: StateKey, weight: float = 1.0) -> float:
+        """
+        Update Q-value using experience replay.
+        The step is scaled by the importance-sampling weight; returns the TD error.
+        """
         alpha = self.get_alpha()
         
-        # Randomly choose which table to update
-        if random.random() < 0.5:
-            q_table_update = self.q_table_a
-            q_table_target = self.q_table_b
-        else:
-            q_table_update = self.q_table_b
-            q_table_target = self.q_table_a
+        # Randomly choose which table to update (0 = A, 1 = B); the other gives the target
+        update_table = 0 if random.random() < 0.5 else 1
         
-        # Ensure state exists
-        if state_key not in q_table_update:
-            q_table_update[state_key] = np.zeros(9, dtype=np.float32)
-        q_values = q_table_update[state_key]
+        # Ensure state exists (this may grow the array, so look it up afterwards)
+        row = self.q_table.ensure_row(self._state_id(state_key))
+        values = self.q_table.values
         
         # Calculate target Q-value
-        if next_state_key in q_table_target:
-            next_q_values = q_table_target[next_state_key]
-            max_next_q = np.max(next_q_values)
+        next_row = int(self.q_table.index[self._state_id(next_state_key)])
+        if next_row >= 0:
+            max_next_q = values[next_row, 1 - update_table].max()
         else:
             max_next_q = 0.0
         
         target = reward + self.gamma * max_next_q
         
         # Q-learning update
-        q_values[action] += alpha * (target - q_values[action])
+        td_error = target - values[row, update_table, action]
+        values[row, update_table, action] += alpha * weight * td_error
         
         self.total_steps += 1
+        return float(td_error)
+    
+    def update_q_values_batch(self, state_ids: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+                              next_ids: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """
+        Vectorized form of update_q_value_with_replay for a batch of transitions.
+        Each transition picks its own table at random; targets come from the
+        values before the batch, and repeated (state, table, action) entries
+        accumulate every step via np.add.at. Returns the TD errors.
+        """
+        alpha = self.get_alpha()
+        update_tables = np.random.randint(0, 2, len(state_ids))
+        
+        # Ensure states exist (this may grow the array, so gather afterwards)
+        rows = self.q_table.ensure_rows(state_ids)
+        values = self.q_table.values
+        
+        # Calculate target Q-values (unseen next states are worth 0)
+        next_rows = self.q_table.index[next_ids]
+        max_next_q = np.where(next_rows >= 0, values[next_rows, 1 - update_tables].max(axis=1), 0.0)
+        targets = rewards + self.gamma * max_next_q
+        
+        # Q-learning updates
+        td_errors = targets - values[rows, update_tables, actions]
+        np.add.at(values, (rows, update_tables, actions), (alpha * weights * td_errors).astype(np.float32))
+        
+        self.total_steps += len(state_ids)
+        return td_errors
     
-    def update_q_value(self, state_key: str, action: int, reward: float, next_state_key: str):
-        """Main Q-value update method."""
+    def update_q_value(self, state_key: StateKey, action: int, reward: float, next_state_key: StateKey):
+        """
+        Main Q-value update method.
+        The action is in the canonical coordinates of state_key (see
+        TicTacToe.get_state_key_and_symmetry).
+        """
         self.update_q_value_with_replay(state_key, action, reward, next_state_key)
         
         # Add to experience buffer
@@ -322,12 +434,16 @@ class UltraAdvancedQLearningAgent:
         if len(self.experience_buffer) < 10:
             return
         
-        # Sample random experiences and replay them
-        experiences = self.sample_experience(batch_size=min(10, len(self.experience_buffer)))
+        # Sample prioritized experiences and replay them
+        slots, batch, weights = self.sample_experience(batch_size=10)
+        live = ~batch['done']
+        batch = batch[live]
+        
+        td_errors = self.update_q_values_batch(batch['state'], batch['action'], batch['reward'],
+                                               batch['next_state'], weights[live])
         
-        for state, action, reward, next_state, done in experiences:
-            if not done:
-                self.update_q_value_with_replay(state, action, reward, next_state)
+        # Refresh priorities with the TD errors seen at replay time
+        self.experience_buffer.update_priorities(slots[live], td_errors)
     
     def train_episode_with_prioritized_start(self, game: TicTacToe) -> Tuple[int, int]:
         """
@@ -338,37 +454,46 @@ class UltraAdvancedQLearningAgent:
             game = self._create_prioritized_start_position()
         
         game.reset()
+        self.mcts.reset()  # Reuse the search tree within an episode only
         self.episodes_trained += 1
         
         moves_made = []
         move_count = 0
         
         while not game.game_over:
-            current_state = game.get_state_key()
+            current_state, symmetry = game.get_state_key_and_symmetry(compact=self.compact_state_keys)
             current_player = game.current_player
             
             action = self.choose_action(game)
             game.make_move(action)
             move_count += 1
             
-            # Enhanced tactical reward with efficiency penalties
-            tactical_reward = self.evaluate_ultra_advanced_patterns(game.board, current_player, move_count)
+            # Learn in canonical coordinates so all symmetric variants share experience
+            canonical_action = self.geometry.to_canonical_action(symmetry, action)
+            
+            # Enhanced tactical reward with efficiency penalties, looked up for the mover
+            if current_player == 1:
+                shaping_id, _ = self.geometry.canonicalize(game.x_bits, game.o_bits)
+            else:
+                shaping_id, _ = self.geometry.canonicalize(game.o_bits, game.x_bits)
+            tactical_reward = float(self.shaping_table[shaping_id]) + self.move_count_penalty(move_count)
+            next_state = game.get_state_key(compact=self.compact_state_keys)
             
             moves_made.append({
                 'state': current_state,
-                'action': action,
+                'action': canonical_action,
                 'player': current_player,
-                'next_state': game.get_state_key(),
+                'next_state': next_state,
                 'tactical_reward': tactical_reward,
                 'move_count': move_count
             })
             
             # Track move patterns for analytics
-            self.move_patterns[f"{current_state}_{action}"] += 1
+            self.move_patterns[f"{current_state}_{canonical_action}"] += 1
             
             if not game.game_over:
                 reward = tactical_reward
-                self.update_q_value(current_state, action, reward, game.get_state_key())
+                self.update_q_value(current_state, canonical_action, reward, next_state)
         
         # Terminal rewards
         winner = game.winner
@@ -413,9 +538,11 @@ class UltraAdvancedQLearningAgent:
         num_pieces = random.randint(2, 4)
         positions = random.sample(range(9), num_pieces)
         
+        board = [0] * 9
         for i, pos in enumerate(positions):
             player = 1 if i % 2 == 0 else -1
-            game.board[pos] = player
+            board[pos] = player
+        game.board = board
         
         # Ensure valid game state
         if game.check_winner():
@@ -429,27 +556,21 @@ class UltraAdvancedQLearningAgent:
     
     def compress_q_table(self):
         """Compress Q-table by removing duplicate Q-values."""
-        compressed_states = {}
-        seen_q_values = {}
-        
-        all_states = set(self.q_table_a.keys()) | set(self.q_table_b.keys())
-        
-        for state_key in all_states:
-            q_a = self.q_table_a.get(state_key, np.zeros(9, dtype=np.float32))
-            q_b = self.q_table_b.get(state_key, np.zeros(9, dtype=np.float32))
-            combined_q = (q_a + q_b) / 2
-            
-            # Create hash of Q-values
-            q_hash = hash(tuple(combined_q.round(6)))
-            
-            if q_hash not in seen_q_values:
-                seen_q_values[q_hash] = state_key
-                compressed_states[state_key] = combined_q.tolist()
+        combined_q = self.q_table.active_values.mean(axis=1)
+        
+        # Keep the first state of every distinct (rounded) Q-value row
+        _, first_rows = np.unique(combined_q.round(6), axis=0, return_index=True)
+        first_rows.sort()
+        compressed_states = {
+            self._output_key(int(state_id)): q_values
+            for state_id, q_values in zip(self.q_table.active_state_ids[first_rows].tolist(),
+                                          combined_q[first_rows].tolist())
+        }
         
-        print(f"Q-table compression: {len(all_states)} → {len(compressed_states)} states")
+        print(f"Q-table compression: {len(self.q_table)} → {len(compressed_states)} states")
         return compressed_states
     
-    def generate_q_value_heatmap(self, state_key: str) -> Dict:
+    def generate_q_value_heatmap(self, state_key: StateKey) -> Dict:
         """Generate Q-value heatmap for a state."""
         q_values = self.get_combined_q_values(state_key)
         
@@ -466,25 +587,19 @@ class UltraAdvancedQLearningAgent:
     
     def analyze_strategic_preferences(self) -> Dict:
         """Analyze strategic preferences from Q-values."""
-        all_states = set(self.q_table_a.keys()) | set(self.q_table_b.keys())
-        
-        position_preferences = defaultdict(list)
-        
-        for state_key in all_states:
-            q_values = self.get_combined_q_values(state_key)
-            
-            # Analyze position preferences
-            for pos in range(9):
-                if q_values[pos] > 0:
-                    position_preferences[pos].append(q_values[pos])
+        combined_q = self.q_table.active_values.mean(axis=1)
+        positive = combined_q > 0
+        frequency = positive.sum(axis=0)
+        average_q = np.where(positive, combined_q, 0).sum(axis=0) / np.maximum(frequency, 1)
+        max_q = np.where(positive, combined_q, -np.inf).max(axis=0, initial=-np.inf)
         
-        # Calculate average preferences
+        # Calculate average preferences for positions with any positive value
         strategic_analysis = {}
-        for pos, values in position_preferences.items():
+        for pos in np.flatnonzero(frequency):
             strategic_analysis[f'position_{pos}'] = {
-                'average_q': float(np.mean(values)),
-                'frequency': len(values),
-                'max_q': float(np.max(values))
+                'average_q': float(average_q[pos]),
+                'frequency': int(frequency[pos]),
+                'max_q': float(max_q[pos])
             }
         
         return strategic_analysis
@@ -558,10 +673,12 @@ class UltraAdvancedQLearningAgent:
             # Load Q-table
             q_table_data = save_data.get('q_table', save_data)  # Backward compatibility
             
-            for state_key, q_values in q_table_data.items():
-                q_array = np.array(q_values, dtype=np.float32)
-                self.q_table_a[state_key] = q_array.copy()
-                self.q_table_b[state_key] = q_array.copy()
+            if q_table_data:
+                # JSON object keys are always strings; legacy tables use "[0, 1, ...]"
+                state_ids = np.array([state_key_to_id(key) for key in q_table_data], dtype=np.int64)
+                q_array = np.array(list(q_table_data.values()), dtype=np.float32)
+                rows = self.q_table.ensure_rows(state_ids)
+                self.q_table.values[rows] = q_array[:, None, :]  # Same values in both tables
             
             # Load analytics if available
             if 'analytics' in save_data:
@@ -573,7 +690,7 @@ class UltraAdvancedQLearningAgent:
                 self.total_steps = training_stats.get('total_steps', 0)
             
             print(f"Ultra-Advanced Q-table loaded from {filename}")
-            print(f"Total states: {len(self.q_table_a):,}")
+            print(f"Total states: {len(self.q_table):,}")
             
         except FileNotFoundError:
             print(f"File {filename} not found. Starting with empty Q-table.")
@@ -582,9 +699,8 @@ class UltraAdvancedQLearningAgent:
     
     def get_statistics(self) -> Dict:
         """Get training statistics."""
-        all_states = set(self.q_table_a.keys()) | set(self.q_table_b.keys())
         return {
-            'total_states': len(all_states),
+            'total_states': len(self.q_table),
             'episodes_trained': self.episodes_trained,
             'total_steps': self.total_steps,
             'current_alpha': self.get_alpha(),
@@ -0,0 +1,200 @@
+"""
+Prioritized experience replay backed by a sum tree.
+
+The sum tree is a binary tree stored in one array: leaves hold transition
+priorities and every internal node holds the sum of its children. Sampling
+walks from the root to a leaf and updating a priority walks from a leaf
+back to the root, so both are O(log N) instead of renormalizing the whole
+buffer on every call. Batches descend all levels at once with NumPy.
+
+Transitions live in a preallocated structured array (state id, action,
+reward, next state id, done), so inserting one writes a single record and
+a sampled batch is one fancy-indexing gather.
+"""
+
+import numpy as np
+from typing import Tuple
+
+
+TRANSITION_DTYPE = np.dtype([
+    ('state', np.int32),
+    ('action', np.int8),
+    ('reward', np.float64),
+    ('next_state', np.int32),
+    ('done', np.bool_),
+])
+
+
+class SumTree:
+    """Fixed-capacity sum tree over float64 priorities."""
+    
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("Sum tree capacity must be positive!")
+        self.capacity = capacity
+        # Leaves start at index `leaf_start`; index 1 is the root, 0 is unused
+        self.leaf_start = 1 << max(capacity - 1, 0).bit_length()
+        self.depth = self.leaf_start.bit_length() - 1
+        self.tree = np.zeros(2 * self.leaf_start, dtype=np.float64)
+        self.levels = np.arange(1, self.depth + 1)
+    
+    @property
+    def total(self) -> float:
+        """Sum of all priorities."""
+        return float(self.tree[1])
+    
+    def get(self, indices: np.ndarray) -> np.ndarray:
+        """Priorities stored at the given slots."""
+        return self.tree[self.leaf_start + np.asarray(indices)]
+    
+    def set(self, index: int, priority: float):
+        """Set one slot's priority and walk its ancestors up to the root."""
+        tree = self.tree
+        node = self.leaf_start + index
+        tree[node] = priority
+        node >>= 1
+        while node:
+            tree[node] = tree[2 * node] + tree[2 * node + 1]
+            node >>= 1
+    
+    def update(self, indices: np.ndarray, priorities: np.ndarray):
+        """Set the priorities of the given slots and refresh their ancestors."""
+        nodes = self.leaf_start + np.atleast_1d(np.asarray(indices, dtype=np.int64))
+        priorities = np.broadcast_to(np.asarray(priorities, dtype=np.float64), nodes.shape)
+        if len(nodes) > 1:
+            # Repeated slots keep their last priority
+            nodes, last = np.unique(nodes[::-1], return_index=True)
+            priorities = priorities[::-1][last]
+        deltas = priorities - self.tree[nodes]
+        self.tree[nodes] = priorities
+        # Add each change to every ancestor up to the root in one call
+        ancestors = nodes[:, None] >> self.levels
+        np.add.at(self.tree, ancestors.ravel(), np.repeat(deltas, self.depth))
+    
+    def find(self, targets: np.ndarray) -> np.ndarray:
+        """Slots whose cumulative priority range contains each target in [0, total)."""
+        targets = np.array(targets, dtype=np.float64)
+        nodes = np.ones(len(targets), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = targets >= left_sum
+            targets -= np.where(go_right, left_sum, 0.0)
+            nodes = left + go_right
+        # Rounding can land on an empty leaf past the filled slots
+        return np.minimum(nodes - self.leaf_start, self.capacity - 1)
+
+
+class PrioritizedReplayBuffer:
+    """
+    Ring buffer of transitions sampled in proportion to priority ** alpha.
+    States are stored as canonical ids (see TicTacToe.get_state_id).
+    
+    With prioritized=False every transition keeps priority 1, which makes
+    sampling uniform and all importance-sampling weights 1.
+    """
+    
+    def __init__(self, capacity: int, alpha: float = 0.6, epsilon: float = 1e-6,
+                 prioritized: bool = True):
+        self.capacity = capacity
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.prioritized = prioritized
+        self.tree = SumTree(capacity)
+        self.transitions = np.zeros(capacity, dtype=TRANSITION_DTYPE)
+        self.position = 0
+        self.size = 0
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def _scale(self, priorities: np.ndarray) -> np.ndarray:
+        """Tree priorities for raw priorities (e.g. absolute TD errors)."""
+        if not self.prioritized:
+            return np.ones_like(priorities, dtype=np.float64)
+        return (np.abs(priorities) + self.epsilon) ** self.alpha
+    
+    def add(self, state: int, action: int, reward: float, next_state: int, done: bool,
+            priority: float = 1.0) -> int:
+        """Store a transition, overwriting the oldest when full. Returns its slot."""
+        slot = self.position
+        self.transitions[slot] = (state, action, reward, next_state, done)
+        if self.prioritized:
+            self.tree.set(slot, (abs(priority) + self.epsilon) ** self.alpha)
+        else:
+            self.tree.set(slot, 1.0)
+        self.position = (slot + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return slot
+    
+    def sample(self, batch_size: int, beta: float = 0.4) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Sample batch_size transitions (with replacement).
+        Returns (slots, transition records, importance-sampling weights);
+        weights are (N * P(i)) ** -beta normalized by the batch maximum.
+        """
+        if self.size == 0 or batch_size <= 0:
+            return np.zeros(0, dtype=np.int64), self.transitions[:0], np.zeros(0)
+        
+        # Stratified sampling: one target per equal slice of the total priority
+        total = self.tree.total
+        segment = total / batch_size
+        targets = (np.arange(batch_size) + np.random.random(batch_size)) * segment
+        slots = np.minimum(self.tree.find(targets), self.size - 1)
+        
+        probabilities = self.tree.get(slots) / total
+        weights = (self.size * probabilities) ** -beta
+        weights /= weights.max()
+        return slots, self.transitions[slots], weights
+    
+    def update_priorities(self, slots: np.ndarray, priorities: np.ndarray):
+        """Refresh priorities (e.g. new TD errors) of previously sampled slots."""
+        if self.prioritized:
+            self.tree.update(slots, self._scale(np.asarray(priorities, dtype=np.float64)))
+    
+    def clear(self):
+        """Drop every stored transition."""
+        self.tree.tree[:] = 0.0
+        self.transitions[:] = 0
+        self.position = 0
+        self.size = 0
+
+
+def test_replay():
+    """Test the sum tree and prioritized sampling."""
+    print("Testing Prioritized Replay")
+    print("=" * 40)
+    
+    tree = SumTree(5)
+    tree.update(np.arange(5), np.array([1.0, 2.0, 3.0, 4.0, 0.0]))
+    print(f"Total priority: {tree.total} (expected: 10.0)")
+    assert tree.total == 10.0
+    assert list(tree.find([0.5, 1.5, 3.5, 9.9])) == [0, 1, 2, 3]
+    tree.update([3], [0.0])
+    assert tree.total == 6.0
+    tree.set(4, 2.5)
+    assert tree.total == 8.5 and list(tree.find([8.0])) == [4]
+    print("✓ Sum tree passed!")
+    
+    np.random.seed(0)
+    buffer = PrioritizedReplayBuffer(4, alpha=1.0, epsilon=0.0)
+    for i, priority in enumerate([1.0, 1.0, 1.0, 7.0, 10.0]):
+        buffer.add(100 + i, i, 0.5, 200 + i, False, priority)
+    print(f"Buffer size after 5 adds to capacity 4: {len(buffer)}")
+    assert len(buffer) == 4 and buffer.transitions[0]['state'] == 104
+    
+    slots, batch, weights = buffer.sample(2000)
+    assert np.array_equal(batch['next_state'] - batch['state'], np.full(2000, 100))
+    share = np.mean(slots == 0)
+    print(f"Share of the priority-10 transition: {share:.2f} (expected: ~0.53)")
+    assert 0.45 < share < 0.60
+    assert weights.max() == 1.0 and weights[slots == 0].max() < 1.0
+    
+    buffer.update_priorities([0], [0.0])
+    slots, _, _ = buffer.sample(100)
+    assert not np.any(slots == 0)
+    print("✓ Prioritized sampling and priority updates passed!")
+
+
+if __name__ == "__main__":
+    test_replay()
@@ -0,0 +1,148 @@
+import numpy as np
+from typing import Optional
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.tictactoe import TicTacToe, WIN_LINES
+
+
+# (8, 3) cell indices of every winning line, for gathering across all games
+WIN_LINE_INDEX = np.array(WIN_LINES, dtype=np.intp)
+
+
+class BatchTicTacToe:
+    """
+    Vectorized Tic-Tac-Toe engine running N independent games at once.
+    
+    Boards are an (N, 9) int8 array (1 for X, -1 for O, 0 for empty) with
+    per-game player, done and winner vectors, so self-play, rollouts and
+    evaluation advance a whole batch per Python call.
+    """
+    
+    def __init__(self, num_games: int):
+        self.num_games = num_games
+        self.boards = np.zeros((num_games, 9), dtype=np.int8)
+        self.current_player = np.ones(num_games, dtype=np.int8)  # 1 for X, -1 for O
+        self.done = np.zeros(num_games, dtype=bool)
+        self.winner = np.zeros(num_games, dtype=np.int8)  # Valid where done: 1, -1 or 0 (draw)
+        self.move_count = np.zeros(num_games, dtype=np.int8)
+    
+    @classmethod
+    def from_game(cls, game: TicTacToe, num_games: int) -> "BatchTicTacToe":
+        """Create a batch of num_games copies of a single game position."""
+        batch = cls(num_games)
+        batch.boards[:] = np.array(game.board, dtype=np.int8)
+        batch.current_player[:] = game.current_player
+        batch.done[:] = game.game_over
+        batch.winner[:] = game.winner or 0
+        batch.move_count[:] = int(np.count_nonzero(batch.boards[0]))
+        return batch
+    
+    def reset(self):
+        """Reset every game to the initial state."""
+        self.boards.fill(0)
+        self.current_player.fill(1)
+        self.done.fill(False)
+        self.winner.fill(0)
+        self.move_count.fill(0)
+    
+    def get_legal_mask(self) -> np.ndarray:
+        """Return an (N, 9) boolean matrix of legal moves (all False for finished games)."""
+        return (self.boards == 0) & ~self.done[:, None]
+    
+    def make_moves(self, actions: np.ndarray) -> np.ndarray:
+        """
+        Apply one action per game.
+        Finished games and illegal actions are skipped; returns the (N,)
+        boolean mask of games where a move was made.
+        """
+        actions = np.asarray(actions, dtype=np.intp)
+        games = np.arange(self.num_games)
+        in_range = (actions >= 0) & (actions < 9)
+        safe_actions = np.where(in_range, actions, 0)
+        valid = in_range & ~self.done & (self.boards[games, safe_actions] == 0)
+        
+        moved = games[valid]
+        players = self.current_player[moved]
+        self.boards[moved, safe_actions[moved]] = players
+        self.move_count[moved] += 1
+        
+        # Gather the 8 lines of every moved game and look for three of the mover's stones
+        line_sums = self.boards[moved][:, WIN_LINE_INDEX].sum(axis=2, dtype=np.int8)
+        won = (line_sums == 3 * players[:, None]).any(axis=1)
+        drawn = ~won & (self.move_count[moved] == 9)
+        
+        finished = won | drawn
+        self.done[moved[finished]] = True
+        self.winner[moved[won]] = players[won]
+        self.winner[moved[drawn]] = 0
+        
+        # Switch players in games that continue
+        continuing = moved[~finished]
+        self.current_player[continuing] = -self.current_player[continuing]
+        
+        return valid
+    
+    def random_actions(self, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Pick a uniformly random legal action per game (-1 for finished games)."""
+        rng = np.random if rng is None else rng  # Global state honours np.random.seed
+        legal = self.get_legal_mask()
+        keys = np.where(legal, rng.random(legal.shape), -1.0)
+        actions = keys.argmax(axis=1)
+        actions[self.done] = -1
+        return actions
+    
+    def play_random(self, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Play every unfinished game to completion with random moves; returns winners."""
+        while not self.done.all():
+            self.make_moves(self.random_actions(rng))
+        return self.winner.copy()
+    
+    def get_rewards(self, player: int) -> np.ndarray:
+        """Per-game reward for a player: +1 win, -1 loss, 0 draw or ongoing."""
+        rewards = np.where(self.winner == player, 1, -1).astype(np.int8)
+        rewards[(self.winner == 0) | ~self.done] = 0
+        return rewards
+
+
+def test_batch_engine():
+    """Test the batch engine against the single-game engine."""
+    import random
+    import time
+    
+    print("Testing Batch Tic-Tac-Toe Engine")
+    print("=" * 40)
+    
+    # Replay random single games through the batch and compare outcomes
+    num_games = 2000
+    rng = random.Random(0)
+    games = []
+    for _ in range(num_games):
+        game = TicTacToe()
+        while not game.game_over:
+            game.make_move(rng.choice(game.get_available_actions()))
+        games.append(game)
+    
+    batch = BatchTicTacToe(num_games)
+    for ply in range(9):
+        actions = np.array([g.actions[ply] if ply < len(g.actions) else -1 for g in games])
+        batch.make_moves(actions)
+    
+    assert batch.done.all()
+    assert all(batch.winner[i] == games[i].winner for i in range(num_games))
+    assert all(batch.boards[i].tolist() == games[i].board for i in range(num_games))
+    print(f"✓ {num_games} replayed games match the single-game engine")
+    
+    # Random playout throughput
+    batch = BatchTicTacToe(100000)
+    start = time.perf_counter()
+    winners = batch.play_random(np.random.default_rng(0))
+    elapsed = time.perf_counter() - start
+    print(f"Random playouts: {batch.num_games / elapsed:,.0f} games/sec")
+    print(f"X wins: {np.mean(winners == 1):.3f}, O wins: {np.mean(winners == -1):.3f}, "
+          f"draws: {np.mean(winners == 0):.3f}")
+
+
+if __name__ == "__main__":
+    test_batch_engine()
@@ -0,0 +1,142 @@
+"""
+Tactical move detection on bitboards.
+
+A threat is a line holding k-1 of one player's stones and one empty cell.
+Threat patterns (the k-1 stone mask and the completing cell) are
+precomputed per board geometry, so win, block and fork cells come from a
+few integer operations instead of trying moves on copied games.
+"""
+
+import os
+import sys
+from typing import Optional, Tuple
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.tictactoe import TicTacToe, BoardGeometry, STANDARD_GEOMETRY
+
+
+class ThreatTable:
+    """Precomputed threat patterns for one board geometry."""
+    
+    def __init__(self, geometry: BoardGeometry):
+        self.geometry = geometry
+        # (stones needed, completing cell bit) for every line and cell in it
+        self.patterns = tuple(
+            (line_mask & ~geometry.cell_bits[cell], geometry.cell_bits[cell])
+            for line, line_mask in zip(geometry.win_lines, geometry.win_masks)
+            for cell in line
+        )
+        # Small boards: player bits -> completing cells of all lines (occupancy ignored)
+        self.completions = None
+        if geometry.num_cells <= 12:
+            self.completions = tuple(
+                self._scan(bits) for bits in range(geometry.full_mask + 1)
+            )
+    
+    def _scan(self, bits: int) -> int:
+        """Cells that would complete a line for a player holding bits."""
+        cells = 0
+        for needed, cell_bit in self.patterns:
+            if bits & needed == needed:
+                cells |= cell_bit
+        return cells
+    
+    def completing_cells(self, bits: int, empty: int) -> int:
+        """Empty cells where a player holding bits completes a line."""
+        if self.completions is not None:
+            return self.completions[bits] & empty
+        return self._scan(bits) & empty
+
+
+_threat_tables = {}
+
+
+def get_threat_table(geometry: BoardGeometry = STANDARD_GEOMETRY) -> ThreatTable:
+    """Return the shared ThreatTable for a geometry, building it on first use."""
+    table = _threat_tables.get(geometry.key)
+    if table is None:
+        table = ThreatTable(geometry)
+        _threat_tables[geometry.key] = table
+    return table
+
+
+def win_cells(own_bits: int, opp_bits: int, geometry: BoardGeometry = STANDARD_GEOMETRY) -> int:
+    """Mask of empty cells where ``own`` wins immediately."""
+    empty = ~(own_bits | opp_bits) & geometry.full_mask
+    return get_threat_table(geometry).completing_cells(own_bits, empty)
+
+
+def block_cells(own_bits: int, opp_bits: int, geometry: BoardGeometry = STANDARD_GEOMETRY) -> int:
+    """Mask of empty cells ``own`` must take to stop an immediate opponent win."""
+    return win_cells(opp_bits, own_bits, geometry)
+
+
+def fork_cells(own_bits: int, opp_bits: int, geometry: BoardGeometry = STANDARD_GEOMETRY) -> int:
+    """Mask of empty cells where ``own`` creates two or more distinct winning cells."""
+    table = get_threat_table(geometry)
+    empty = ~(own_bits | opp_bits) & geometry.full_mask
+    forks = 0
+    remaining = empty
+    while remaining:
+        cell_bit = remaining & -remaining
+        remaining ^= cell_bit
+        threats = table.completing_cells(own_bits | cell_bit, empty & ~cell_bit)
+        if threats & (threats - 1):  # More than one bit set
+            forks |= cell_bit
+    return forks
+
+
+def tactical_masks(game: TicTacToe) -> Tuple[int, int, int]:
+    """(win cells, block cells, fork cells) for the player to move."""
+    if game.current_player == 1:
+        own_bits, opp_bits = game.x_bits, game.o_bits
+    else:
+        own_bits, opp_bits = game.o_bits, game.x_bits
+    geometry = game.geometry
+    return (win_cells(own_bits, opp_bits, geometry),
+            block_cells(own_bits, opp_bits, geometry),
+            fork_cells(own_bits, opp_bits, geometry))
+
+
+def find_win_or_block(game: TicTacToe) -> Optional[int]:
+    """
+    Lowest cell that wins immediately, else the lowest cell that blocks an
+    immediate opponent win, else None.
+    """
+    if game.current_player == 1:
+        own_bits, opp_bits = game.x_bits, game.o_bits
+    else:
+        own_bits, opp_bits = game.o_bits, game.x_bits
+    geometry = game.geometry
+    cells = win_cells(own_bits, opp_bits, geometry) or block_cells(own_bits, opp_bits, geometry)
+    if not cells:
+        return None
+    return (cells & -cells).bit_length() - 1
+
+
+def test_tactics():
+    """Test tactical detection."""
+    print("Testing Tactical Detection")
+    print("=" * 40)
+    
+    game = TicTacToe()
+    game.board = [1, 1, 0, -1, -1, 0, 0, 0, 0]
+    game.current_player = 1
+    game.display_board()
+    win, block, fork = tactical_masks(game)
+    print(f"Win cells: {bin(win)}, block cells: {bin(block)}")
+    assert find_win_or_block(game) == 2
+    game.current_player = -1
+    assert find_win_or_block(game) == 5
+    print("✓ Win and block detection passed!")
+    
+    game.board = [1, 0, 0, 0, -1, 0, 0, 0, 1]
+    game.current_player = 1
+    _, _, fork = tactical_masks(game)
+    print(f"X fork cells: {[i for i in range(9) if fork >> i & 1]} (expected: [2, 6])")
+    assert fork == (1 << 2) | (1 << 6)
+    print("✓ Fork detection passed!")
+
+
+if __name__ == "__main__":
+    test_tactics()
@@ -1,127 +1,515 @@
-import numpy as np
-from typing import List, Tuple, Optional, Set
+from typing import List, Tuple, Optional, Set, Union
+
+
+class BoardGeometry:
+    """
+    Precomputed bitboard tables for an m x n board with k-in-a-row wins.
+    
+    Bit i of a player's bitboard is set when cell i (row-major) holds one of
+    that player's stones. Line masks, the symmetry group and canonical ids are
+    all derived from (rows, cols, k); get_geometry shares one instance per shape.
+    """
+    
+    def __init__(self, rows: int = 3, cols: int = 3, k: int = 3):
+        if k > max(rows, cols):
+            raise ValueError(f"k={k} does not fit on a {rows}x{cols} board")
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.key = (rows, cols, k)
+        self.num_cells = rows * cols
+        self.cell_bits = tuple(1 << i for i in range(self.num_cells))
+        self.full_mask = (1 << self.num_cells) - 1
+        
+        self.win_lines = self._build_win_lines()
+        self.win_masks = tuple(sum(self.cell_bits[i] for i in line) for line in self.win_lines)
+        # Line masks passing through each cell, so a move only checks its own lines
+        self.cell_win_masks = tuple(
+            tuple(mask for mask in self.win_masks if mask & bit) for bit in self.cell_bits
+        )
+        
+        # Empty-cell mask -> sorted tuple of the empty cell indices (small boards only)
+        self.mask_to_actions = None
+        if self.num_cells <= 12:
+            self.mask_to_actions = tuple(
+                self._actions_from_mask(mask) for mask in range(self.full_mask + 1)
+            )
+        
+        self.symmetries = self._build_symmetries()
+        # Cell a of the original board lands on inverse_symmetries[s][a]
+        self.inverse_symmetries = tuple(
+            tuple(perm.index(i) for i in range(self.num_cells)) for perm in self.symmetries
+        )
+        
+        # A canonical id is the base-3 number of the transformed board read
+        # cell 0 first, with digits 0/1/2 for opponent/empty/own. Smaller ids
+        # are lexicographically smaller boards, so the canonical form is the
+        # minimum id over the symmetry group.
+        self.id_weights = tuple(3 ** (self.num_cells - 1 - i) for i in range(self.num_cells))
+        self.empty_id = sum(self.id_weights)
+        
+        # Per symmetry and chunk of the bitboard: chunk bits -> summed id weights
+        # of the transformed cells. Boards up to 12 cells use a single chunk.
+        self._chunk_size = self.num_cells if self.num_cells <= 12 else 8
+        self._chunk_mask = (1 << self._chunk_size) - 1
+        self._chunk_shifts = tuple(range(0, self.num_cells, self._chunk_size))
+        self._symmetry_weights = tuple(
+            tuple(self._build_chunk_weights(perm, shift) for shift in self._chunk_shifts)
+            for perm in self.symmetries
+        )
+        
+        # Lazily built for 3x3: position code (own | opp << cells) -> (id, symmetry)
+        self._canonical_table = None
+        self._canonical_strings = {}
+    
+    def _build_win_lines(self) -> Tuple[Tuple[int, ...], ...]:
+        """All k-in-a-row segments: rows, columns, diagonals, anti-diagonals."""
+        rows, cols, k = self.rows, self.cols, self.k
+        lines = []
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            for r in range(rows):
+                for c in range(cols):
+                    end_r = r + dr * (k - 1)
+                    end_c = c + dc * (k - 1)
+                    if 0 <= end_r < rows and 0 <= end_c < cols:
+                        lines.append(tuple((r + dr * i) * cols + c + dc * i for i in range(k)))
+        return tuple(lines)
+    
+    def _build_symmetries(self) -> Tuple[Tuple[int, ...], ...]:
+        """
+        Symmetries as cell permutations: transformed[i] = board[perm[i]].
+        Square boards: 4 rotations (0°, 90°, 180°, 270° counter-clockwise) +
+        4 reflections (left-right, up-down, main diagonal, anti-diagonal).
+        Rectangular boards keep identity, 180° rotation and the two flips.
+        """
+        rows, cols = self.rows, self.cols
+        last_r, last_c = rows - 1, cols - 1
+        if rows == cols:
+            n = last_r
+            sources = (
+                lambda r, c: (r, c),
+                lambda r, c: (c, n - r),
+                lambda r, c: (n - r, n - c),
+                lambda r, c: (n - c, r),
+                lambda r, c: (r, n - c),
+                lambda r, c: (n - r, c),
+                lambda r, c: (c, r),
+                lambda r, c: (n - c, n - r),
+            )
+        else:
+            sources = (
+                lambda r, c: (r, c),
+                lambda r, c: (last_r - r, last_c - c),
+                lambda r, c: (r, last_c - c),
+                lambda r, c: (last_r - r, c),
+            )
+        symmetries = []
+        for source in sources:
+            perm = []
+            for r in range(rows):
+                for c in range(cols):
+                    src_r, src_c = source(r, c)
+                    perm.append(src_r * cols + src_c)
+            symmetries.append(tuple(perm))
+        return tuple(symmetries)
+    
+    def _build_chunk_weights(self, perm: Tuple[int, ...], shift: int) -> Tuple[int, ...]:
+        """Summed id weights for every value of one bitboard chunk under a symmetry."""
+        # Canonical cell j takes original cell perm[j]; index by original cell
+        weight_of_cell = [0] * self.num_cells
+        for j, source in enumerate(perm):
+            weight_of_cell[source] = self.id_weights[j]
+        chunk_cells = range(shift, min(shift + self._chunk_size, self.num_cells))
+        return tuple(
+            sum(weight_of_cell[cell] for cell in chunk_cells if value & (1 << (cell - shift)))
+            for value in range(1 << self._chunk_size)
+        )
+    
+    def _actions_from_mask(self, mask: int) -> Tuple[int, ...]:
+        """Sorted tuple of the cell indices set in mask."""
+        actions = []
+        while mask:
+            low_bit = mask & -mask
+            actions.append(low_bit.bit_length() - 1)
+            mask ^= low_bit
+        return tuple(actions)
+    
+    def actions_from_mask(self, mask: int) -> Tuple[int, ...]:
+        """Sorted tuple of the cell indices set in mask (table lookup when available)."""
+        if self.mask_to_actions is not None:
+            return self.mask_to_actions[mask]
+        return self._actions_from_mask(mask)
+    
+    def has_win(self, bits: int) -> bool:
+        """Whether a player's bitboard contains a complete line."""
+        for mask in self.win_masks:
+            if bits & mask == mask:
+                return True
+        return False
+    
+    def _symmetry_weight(self, symmetry: int, bits: int) -> int:
+        """Summed id weights of a bitboard's cells after applying a symmetry."""
+        total = 0
+        chunk_mask = self._chunk_mask
+        for shift, weights in zip(self._chunk_shifts, self._symmetry_weights[symmetry]):
+            total += weights[(bits >> shift) & chunk_mask]
+        return total
+    
+    def _compute_canonical(self, own_bits: int, opp_bits: int) -> Tuple[int, int]:
+        """Find the smallest id over the symmetry group and the symmetry that gives it."""
+        best_id = None
+        best_symmetry = 0
+        if len(self._chunk_shifts) == 1:
+            for symmetry, (weights,) in enumerate(self._symmetry_weights):
+                state_id = self.empty_id + weights[own_bits] - weights[opp_bits]
+                if best_id is None or state_id < best_id:
+                    best_id = state_id
+                    best_symmetry = symmetry
+            return best_id, best_symmetry
+        
+        for symmetry in range(len(self.symmetries)):
+            state_id = (self.empty_id + self._symmetry_weight(symmetry, own_bits)
+                        - self._symmetry_weight(symmetry, opp_bits))
+            if best_id is None or state_id < best_id:
+                best_id = state_id
+                best_symmetry = symmetry
+        return best_id, best_symmetry
+    
+    def _build_canonical_table(self) -> dict:
+        """Canonicalize every reachable position once, from both players' perspectives."""
+        table = {}
+        shift = self.num_cells
+        stack = [(0, 0, 1)]
+        seen = set()
+        while stack:
+            x_bits, o_bits, player = stack.pop()
+            if (x_bits, o_bits) in seen:
+                continue
+            seen.add((x_bits, o_bits))
+            for own_bits, opp_bits in ((x_bits, o_bits), (o_bits, x_bits)):
+                table[own_bits | (opp_bits << shift)] = self._compute_canonical(own_bits, opp_bits)
+            
+            if self.has_win(x_bits) or self.has_win(o_bits):
+                continue  # Game over, no successors
+            for action in self.actions_from_mask(~(x_bits | o_bits) & self.full_mask):
+                if player == 1:
+                    stack.append((x_bits | self.cell_bits[action], o_bits, -1))
+                else:
+                    stack.append((x_bits, o_bits | self.cell_bits[action], 1))
+        return table
+    
+    def canonicalize(self, own_bits: int, opp_bits: int) -> Tuple[int, int]:
+        """
+        Return (canonical id, symmetry index) for a board seen from ``own``'s side.
+        On 3x3, reachable positions are a single table lookup; anything else is computed.
+        """
+        if self.num_cells > 9:
+            return self._compute_canonical(own_bits, opp_bits)
+        if self._canonical_table is None:
+            self._canonical_table = self._build_canonical_table()
+        entry = self._canonical_table.get(own_bits | (opp_bits << self.num_cells))
+        if entry is None:
+            return self._compute_canonical(own_bits, opp_bits)
+        return entry
+    
+    def to_canonical_action(self, symmetry: int, action: int) -> int:
+        """Map a cell of the original board to its cell on the canonical board."""
+        return self.inverse_symmetries[symmetry][action]
+    
+    def from_canonical_action(self, symmetry: int, canonical_action: int) -> int:
+        """Map a cell of the canonical board back to the original board."""
+        return self.symmetries[symmetry][canonical_action]
+    
+    def state_id_to_board(self, state_id: int) -> List[int]:
+        """Decode a canonical id back into a flat cell list (1 own, -1 opponent)."""
+        board = []
+        for weight in self.id_weights:
+            digit = state_id // weight
+            state_id -= digit * weight
+            board.append(digit - 1)
+        return board
+    
+    def state_id_to_string(self, state_id: int) -> str:
+        """String form of a canonical id, e.g. ``"[0, 1, -1, ...]"``."""
+        state = self._canonical_strings.get(state_id)
+        if state is None:
+            state = str(self.state_id_to_board(state_id))
+            if self.num_cells <= 9:
+                self._canonical_strings[state_id] = state
+        return state
+    
+    def bits_to_board(self, x_bits: int, o_bits: int) -> List[int]:
+        """Expand X/O bitboards into a flat cell list (1 for X, -1 for O)."""
+        return [1 if x_bits & bit else (-1 if o_bits & bit else 0) for bit in self.cell_bits]
+
+
+_geometries = {}
+
+
+def get_geometry(rows: int = 3, cols: int = 3, k: int = 3) -> BoardGeometry:
+    """Return the shared BoardGeometry for a board shape, building it on first use."""
+    geometry = _geometries.get((rows, cols, k))
+    if geometry is None:
+        geometry = BoardGeometry(rows, cols, k)
+        _geometries[(rows, cols, k)] = geometry
+    return geometry
+
+
+# Standard 3x3 board; module-level tables kept for callers that assume it
+STANDARD_GEOMETRY = get_geometry(3, 3, 3)
+CELL_BITS = STANDARD_GEOMETRY.cell_bits
+FULL_MASK = STANDARD_GEOMETRY.full_mask
+WIN_LINES = STANDARD_GEOMETRY.win_lines
+WIN_MASKS = STANDARD_GEOMETRY.win_masks
+CELL_WIN_MASKS = STANDARD_GEOMETRY.cell_win_masks
+MASK_TO_ACTIONS = STANDARD_GEOMETRY.mask_to_actions
+SYMMETRIES = STANDARD_GEOMETRY.symmetries
+INVERSE_SYMMETRIES = STANDARD_GEOMETRY.inverse_symmetries
+
+
+def canonicalize(own_bits: int, opp_bits: int) -> Tuple[int, int]:
+    """Return (canonical id, symmetry index) for a 3x3 board seen from ``own``'s side."""
+    return STANDARD_GEOMETRY.canonicalize(own_bits, opp_bits)
+
+
+def state_id_to_board(state_id: int) -> List[int]:
+    """Decode a 3x3 canonical id back into a 9-cell list (1 own, -1 opponent)."""
+    return STANDARD_GEOMETRY.state_id_to_board(state_id)
+
+
+def state_key_to_id(state_key: Union[int, str]) -> int:
+    """
+    Convert any 3x3 state key to a canonical id.
+    Accepts ids, their decimal strings (JSON object keys) and legacy
+    ``"[0, 1, -1, ...]"`` keys, which are re-canonicalized.
+    """
+    if isinstance(state_key, str):
+        state_key = state_key.strip()
+        if state_key.startswith('['):
+            board = [int(cell) for cell in state_key[1:-1].split(',')]
+            own_bits, opp_bits = board_to_bits(board)
+            return canonicalize(own_bits, opp_bits)[0]
+    return int(state_key)
+
+
+def state_id_to_string(state_id: int) -> str:
+    """String form of a 3x3 canonical id, e.g. ``"[0, 1, -1, ...]"``."""
+    return STANDARD_GEOMETRY.state_id_to_string(state_id)
+
+
+def bits_to_board(x_bits: int, o_bits: int) -> List[int]:
+    """Expand X/O bitboards into a flat 9-cell list (1 for X, -1 for O)."""
+    return STANDARD_GEOMETRY.bits_to_board(x_bits, o_bits)
+
+
+def board_to_bits(board: List[int]) -> Tuple[int, int]:
+    """Pack a flat cell list into (X bits, O bits)."""
+    x_bits = 0
+    o_bits = 0
+    for i, cell in enumerate(board):
+        if cell == 1:
+            x_bits |= 1 << i
+        elif cell == -1:
+            o_bits |= 1 << i
+    return x_bits, o_bits
 
 
 class TicTacToe:
-    """Tic-Tac-Toe game engine with canonical state representation and symmetry reduction."""
+    """Tic-Tac-Toe game engine with canonical state representation and symmetry reduction.
+
+    The position is stored as two bitboards (one per player); ``board`` is
+    exposed as a list view for callers that read or assign whole boards.
+    The default is the classic 3x3 game; ``rows``, ``cols`` and ``k`` select
+    an m,n,k variant such as 4x4 or 5x5 k-in-a-row.
+    """
     
-    def __init__(self):
-        self.board = [0] * 9  # 3x3 grid as flat list
+    def __init__(self, rows: int = 3, cols: int = 3, k: int = 3):
+        self.geometry = get_geometry(rows, cols, k)
+        self.x_bits = 0  # Cells occupied by X (player 1)
+        self.o_bits = 0  # Cells occupied by O (player -1)
         self.current_player = 1  # 1 for X, -1 for O
         self.game_over = False
         self.winner = None
-        self.move_history = []  # Track moves for Q-learning updates
+        self.actions = []  # Actions played via make_move (move_history, undo_move)
         
     def reset(self):
         """Reset the game to initial state."""
-        self.board = [0] * 9
+        self.x_bits = 0
+        self.o_bits = 0
         self.current_player = 1
         self.game_over = False
         self.winner = None
-        self.move_history = []
+        self.actions = []
+    
+    @property
+    def board(self) -> List[int]:
+        """Board as a flat row-major cell list (1 for X, -1 for O, 0 for empty)."""
+        return self.geometry.bits_to_board(self.x_bits, self.o_bits)
+    
+    @board.setter
+    def board(self, board: List[int]):
+        self.x_bits, self.o_bits = board_to_bits(board)
+        self.actions = []  # Moves before an assigned board cannot be undone
+    
+    @property
+    def move_history(self) -> List[Tuple[str, int]]:
+        """
+        (canonical state after the move from the mover's perspective, action)
+        for each move made. Derived on demand from ``actions`` so that
+        make_move does not pay for canonicalization.
+        """
+        geometry = self.geometry
+        history = []
+        x_bits, o_bits = self.x_bits, self.o_bits
+        mover = self.current_player if self.game_over else -self.current_player
+        
+        # Walk back from the current position, removing one stone per move
+        for action in reversed(self.actions):
+            if mover == 1:
+                state_id, _ = geometry.canonicalize(x_bits, o_bits)
+                x_bits &= ~geometry.cell_bits[action]
+            else:
+                state_id, _ = geometry.canonicalize(o_bits, x_bits)
+                o_bits &= ~geometry.cell_bits[action]
+            history.append((geometry.state_id_to_string(state_id), action))
+            mover = -mover
+        
+        history.reverse()
+        return history
+    
+    def get_empty_mask(self) -> int:
+        """Return the bitmask of empty cells."""
+        return ~(self.x_bits | self.o_bits) & self.geometry.full_mask
         
     def get_available_actions(self) -> List[int]:
-        """Return list of available action indices (0-8 for empty cells)."""
-        return [i for i in range(9) if self.board[i] == 0]
+        """Return list of available action indices (cell indices of empty cells)."""
+        return list(self.legal_actions())
+    
+    def legal_actions(self) -> Tuple[int, ...]:
+        """Available actions as a shared read-only tuple (no allocation, for search)."""
+        geometry = self.geometry
+        empty = ~(self.x_bits | self.o_bits) & geometry.full_mask
+        if geometry.mask_to_actions is not None:
+            return geometry.mask_to_actions[empty]
+        return geometry.actions_from_mask(empty)
     
     def make_move(self, action: int) -> bool:
         """
         Make a move at the given action index.
         Returns True if move was valid, False otherwise.
         """
-        if action not in self.get_available_actions():
+        geometry = self.geometry
+        if self.game_over or not 0 <= action < geometry.num_cells:
+            return False
+        bit = geometry.cell_bits[action]
+        occupied = self.x_bits | self.o_bits
+        if occupied & bit:
             return False
-            
-        self.board[action] = self.current_player
-        self.move_history.append((self.get_canonical_state(), action))
         
-        # Check for win or draw
-        if self.check_winner():
-            self.game_over = True
-            self.winner = self.current_player
-        elif len(self.get_available_actions()) == 0:
+        if self.current_player == 1:
+            self.x_bits |= bit
+            own_bits = self.x_bits
+        else:
+            self.o_bits |= bit
+            own_bits = self.o_bits
+        self.actions.append(action)
+        
+        # Only lines through the new stone can have been completed
+        for mask in geometry.cell_win_masks[action]:
+            if own_bits & mask == mask:
+                self.game_over = True
+                self.winner = self.current_player
+                return True
+        
+        if occupied | bit == geometry.full_mask:
             self.game_over = True
             self.winner = 0  # Draw
         else:
-            self.current_player *= -1  # Switch players
+            self.current_player = -self.current_player  # Switch players
             
         return True
     
+    def undo_move(self) -> int:
+        """
+        Take back the last move made with make_move, in place.
+        Restores board, current player, winner and game_over; returns the action.
+        """
+        if not self.actions:
+            raise ValueError("No moves to undo!")
+        action = self.actions.pop()
+        
+        # The player only switches when the game continues
+        if not self.game_over:
+            self.current_player = -self.current_player
+        if self.current_player == 1:
+            self.x_bits &= ~self.geometry.cell_bits[action]
+        else:
+            self.o_bits &= ~self.geometry.cell_bits[action]
+        self.game_over = False
+        self.winner = None
+        return action
+    
     def check_winner(self) -> bool:
         """Check if current player has won."""
-        board = self.board
-        
-        # Check rows
-        for i in range(0, 9, 3):
-            if board[i] == board[i+1] == board[i+2] == self.current_player:
-                return True
-                
-        # Check columns
-        for i in range(3):
-            if board[i] == board[i+3] == board[i+6] == self.current_player:
-                return True
-                
-        # Check diagonals
-        if board[0] == board[4] == board[8] == self.current_player:
-            return True
-        if board[2] == board[4] == board[6] == self.current_player:
-            return True
-            
-        return False
+        own_bits = self.x_bits if self.current_player == 1 else self.o_bits
+        return self.geometry.has_win(own_bits)
     
     def get_canonical_state(self) -> str:
         """
         Get canonical state representation from current player's perspective.
         Current player is always represented as 1, opponent as -1.
         """
-        # Create board from current player's perspective
-        canonical_board = [cell * self.current_player for cell in self.board]
-        
-        # Apply symmetry reduction to get smallest representation
-        return self._get_canonical_symmetric_state(canonical_board)
+        return self.geometry.state_id_to_string(self.get_state_id())
     
     def _get_canonical_symmetric_state(self, board: List[int]) -> str:
         """
-        Apply all 8 symmetries and return lexicographically smallest state.
+        Apply all board symmetries and return lexicographically smallest state.
         Symmetries: 4 rotations (0°, 90°, 180°, 270°) + 4 reflections
         """
-        # Convert to 3x3 matrix for transformations
-        matrix = np.array(board).reshape(3, 3)
-        
-        # Generate all symmetric states
-        symmetric_states = []
-        
-        # 4 rotations
-        for rotation in [0, 90, 180, 270]:
-            if rotation == 0:
-                rotated = matrix
-            else:
-                rotated = np.rot90(matrix, k=rotation//90)
-            symmetric_states.append(rotated.flatten().tolist())
-        
-        # 4 reflections
-        symmetric_states.append(np.fliplr(matrix).flatten().tolist())  # horizontal
-        symmetric_states.append(np.flipud(matrix).flatten().tolist())  # vertical
-        symmetric_states.append(np.fliplr(np.flipud(matrix)).flatten().tolist())  # diagonal
-        symmetric_states.append(np.flipud(np.fliplr(matrix)).flatten().tolist())  # anti-diagonal
-        
-        # Convert to strings and find lexicographically smallest
-        state_strings = [str(state) for state in symmetric_states]
-        return min(state_strings)
+        own_bits, opp_bits = board_to_bits(board)
+        state_id, _ = self.geometry.canonicalize(own_bits, opp_bits)
+        return self.geometry.state_id_to_string(state_id)
+    
+    def get_state_id(self) -> int:
+        """Get the canonical id (base-3 code) of the current state."""
+        if self.current_player == 1:
+            return self.geometry.canonicalize(self.x_bits, self.o_bits)[0]
+        return self.geometry.canonicalize(self.o_bits, self.x_bits)[0]
+    
+    def get_state_key_and_symmetry(self, compact: bool = False) -> Tuple[Union[str, int], int]:
+        """
+        Get the Q-table key together with the symmetry that produced it.
+        Actions must be mapped with geometry.to_canonical_action(symmetry, action)
+        before indexing that state's Q-values, and back with from_canonical_action.
+        """
+        if self.current_player == 1:
+            state_id, symmetry = self.geometry.canonicalize(self.x_bits, self.o_bits)
+        else:
+            state_id, symmetry = self.geometry.canonicalize(self.o_bits, self.x_bits)
+        if compact:
+            return state_id, symmetry
+        return self.geometry.state_id_to_string(state_id), symmetry
     
-    def get_state_key(self) -> str:
-        """Get current state as string key for Q-table."""
+    def get_state_key(self, compact: bool = False) -> Union[str, int]:
+        """
+        Get current state as key for Q-table.
+        compact=True returns the integer canonical id instead of the string form.
+        """
+        if compact:
+            return self.get_state_id()
         return self.get_canonical_state()
     
     def display_board(self):
         """Display the current board state."""
         symbols = {1: 'X', -1: 'O', 0: ' '}
+        board = self.board
+        rows, cols = self.geometry.rows, self.geometry.cols
         
-        for i in range(3):
-            row_start = i * 3
-            print(f" {symbols[self.board[row_start]]} | {symbols[self.board[row_start+1]]} | {symbols[self.board[row_start+2]]}")
-            if i < 2:
-                print(" ---------")
+        for i in range(rows):
+            row_start = i * cols
+            print(" " + " | ".join(symbols[cell] for cell in board[row_start:row_start + cols]))
+            if i < rows - 1:
+                print(" " + "-" * (4 * cols - 3))
     
     def get_reward(self, player: int) -> int:
         """
@@ -140,12 +528,13 @@ class TicTacToe:
     
     def copy(self):
         """Create a copy of the current game state."""
-        new_game = TicTacToe()
-        new_game.board = self.board.copy()
+        new_game = TicTacToe(*self.geometry.key)
+        new_game.x_bits = self.x_bits
+        new_game.o_bits = self.o_bits
         new_game.current_player = self.current_player
         new_game.game_over = self.game_over
         new_game.winner = self.winner
-        new_game.move_history = self.move_history.copy()
+        new_game.actions = self.actions.copy()
         return new_game
 
 
@@ -183,7 +572,51 @@ def test_game_engine():
     game.current_player = 1
     print(f"Original board: {test_board}")
     print(f"Canonical state: {game.get_canonical_state()}")
+    
+    # Test a larger m,n,k variant
+    print("\nTesting 4x4 board with 4 in a row:")
+    game = TicTacToe(rows=4, cols=4, k=4)
+    for move in [0, 4, 5, 8, 10, 12, 15]:  # X wins on the main diagonal
+        game.make_move(move)
+    game.display_board()
+    print(f"Game over: {game.game_over}, Winner: {game.winner}")
+    print(f"Winning lines: {len(game.geometry.win_lines)}, symmetries: {len(game.geometry.symmetries)}")
+
+
+def benchmark_moves(num_games: int = 20000, seed: int = 42):
+    """
+    Micro-benchmark of random self-play throughput.
+    Compares plain make_move with also canonicalizing every position, which is
+    what make_move used to do eagerly to record move_history.
+    """
+    import random
+    import time
+    
+    rng = random.Random(seed)
+    game_sequences = []
+    for _ in range(num_games):
+        game = TicTacToe()
+        while not game.game_over:
+            game.make_move(rng.choice(game.legal_actions()))
+        game_sequences.append(list(game.actions))
+    total_moves = sum(len(actions) for actions in game_sequences)
+    
+    print("Benchmarking make_move")
+    print("=" * 40)
+    for label, record_history in (("eager history (before)", True), ("lazy history (after)", False)):
+        game = TicTacToe()
+        start = time.perf_counter()
+        for actions in game_sequences:
+            game.reset()
+            for action in actions:
+                game.make_move(action)
+                if record_history:
+                    game.get_canonical_state()
+        elapsed = time.perf_counter() - start
+        print(f"{label:<24} {total_moves / elapsed:>12,.0f} moves/sec")
 
 
 if __name__ == "__main__":
     test_game_engine()
+    print()
+    benchmark_moves()
@@ -39,7 +39,8 @@ class UltraAdvancedSelfPlayTrainer:
                  use_parallel: bool = True,
                  max_workers: int = None,
                  early_stopping: bool = True,
-                 convergence_threshold: float = 0.02):
+                 convergence_threshold: float = 0.02,
+                 mcts_config: dict = None):
 
         self.episodes = episodes
         self.save_interval = save_interval
@@ -61,7 +62,8 @@ class UltraAdvancedSelfPlayTrainer:
             use_double_q=True,
             use_dyna_q=True,
             experience_replay_size=20000,
-            prioritized_replay=True
+            prioritized_replay=True,
+            mcts_config=mcts_config
         )
         
         # Training statistics
@@ -244,6 +246,9 @@ class UltraAdvancedSelfPlayTrainer:
         print(f"Dyna-Q: {self.agent.use_dyna_q}")
         print(f"Experience replay: {self.agent.experience_replay_size:,}")
         print(f"Prioritized replay: {self.agent.prioritized_replay}")
+        print(f"MCTS: {self.agent.use_mcts} ({self.agent.mcts.iterations} iterations, "
+              f"c={self.agent.mcts.exploration_constant}, "
+              f"up to {self.agent.mcts_max_legal_moves} legal moves)")
         print()
         
         self.training_start_time = time.time()
@@ -337,7 +342,7 @@ class UltraAdvancedSelfPlayTrainer:
             'episodes_per_second': self.episodes_per_second,
             'epsilon': self.agent.get_epsilon(),
             'alpha': self.agent.get_alpha(),
-            'total_states': len(set(self.agent.q_table_a.keys()) | set(self.agent.q_table_b.keys())),
+            'total_states': len(self.agent.q_table),
             'avg_episode_length': avg_length,
             'p1_win_rate': p1_rate,
             'p2_win_rate': p2_rate,
@@ -402,9 +407,8 @@ class UltraAdvancedSelfPlayTrainer:
         print()
         
         # Q-table statistics
-        all_states = set(self.agent.q_table_a.keys()) | set(self.agent.q_table_b.keys())
         print("Ultra-Advanced Q-Table Statistics:")
-        print(f"  Total states: {len(all_states):,}")
+        print(f"  Total states: {len(self.agent.q_table):,}")
         print(f"  Total steps: {self.agent.total_steps:,}")
         print(f"  Final alpha: {self.agent.get_alpha():.6f}")
         print(f"  Final epsilon: {self.agent.get_epsilon():.6f}")
@@ -530,7 +534,8 @@ def main():
         q_table_file=config.get('paths', {}).get('q_table_file', 'q_table.json'),
         use_parallel=hardware_config.get('use_parallel', True),
         early_stopping=training_config.get('early_stopping', True),
-        convergence_threshold=training_config.get('convergence_threshold', 0.02)
+        convergence_threshold=training_config.get('convergence_threshold', 0.02),
+        mcts_config=config.get('mcts', {})
     )
     
     # Start ultra-advanced training